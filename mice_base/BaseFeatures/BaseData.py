@@ -2,8 +2,10 @@ import numpy as np
 import itertools as it
 from ..ScaleParams import ScaleParams
 from typing import (
+    Iterator,
     List,
-    NamedTuple
+    NamedTuple,
+    Optional
 )
 
 
@@ -43,3 +45,74 @@ class BaseData(NamedTuple):
             arr[divisions: 2 * divisions].tolist(),
             arr[2 * divisions:].tolist(),
         )
+
+
+class BaseDataArray:
+    """BaseData backed by one C-contiguous `(3, W)` array, which is not copied.
+
+    `directions`, `sizes` and `entropies` are views of its rows, `to_array`
+    returns the flattened buffer without copying it, and `scale`/`descale`
+    can write into a caller-supplied BaseDataArray, including this one.
+    Iterating yields the three rows, so `directions, sizes, entropies = data`
+    works as with BaseData.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, array: np.ndarray):
+        if array.ndim != 2 or array.shape[0] != 3:
+            raise ValueError(f"Expected a (3, W) array, got shape {array.shape}")
+        # to_array, and so scale/descale(out=...), must view the caller's buffer.
+        if not array.flags.c_contiguous:
+            raise ValueError("Expected a C-contiguous array, see BaseDataArray.from_array")
+        self.array = array
+
+    @classmethod
+    def empty(cls, win_size: int, dtype=np.float64) -> "BaseDataArray":
+        return cls(np.empty((3, win_size), dtype=dtype))
+
+    @classmethod
+    def from_array(cls, arr, dtype=np.float64) -> "BaseDataArray":
+        """View of a flat array of directions, sizes and entropies, copied only
+        if it is not a contiguous array of `dtype`."""
+        return cls(np.ascontiguousarray(arr, dtype=dtype).reshape(3, -1))
+
+    @classmethod
+    def from_base_data(cls, data: BaseData, dtype=np.float64) -> "BaseDataArray":
+        return cls(np.array(data, dtype=dtype))
+
+    def to_base_data(self) -> BaseData:
+        return BaseData.from_array(self.to_array())
+
+    @property
+    def directions(self) -> np.ndarray:
+        return self.array[0]
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.array[1]
+
+    @property
+    def entropies(self) -> np.ndarray:
+        return self.array[2]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.array)
+
+    def __len__(self) -> int:
+        return 3
+
+    def to_array(self) -> np.ndarray:
+        return self.array.reshape(-1)
+
+    def scale(self, scaler: ScaleParams, out: Optional["BaseDataArray"] = None) -> "BaseDataArray":
+        if out is None:
+            out = BaseDataArray(np.empty_like(self.array))
+        scaler.scale(self.to_array(), out=out.to_array())
+        return out
+
+    def descale(self, scaler: ScaleParams, out: Optional["BaseDataArray"] = None) -> "BaseDataArray":
+        if out is None:
+            out = BaseDataArray(np.empty_like(self.array))
+        scaler.descale(self.to_array(), out=out.to_array())
+        return out
@@ -1,7 +1,8 @@
 # MICE
 from .WindowFeature import windowize
-from ..fe_types import FlowID, Pkt
+from ..fe_types import FlowID, Pkt, Proto, RawPkt
 from .PerPacketFeature import PerPacketFeature
+from .raw_headers import RawHeaders, parse_frame
 
 # scapy
 import scapy.layers.inet
@@ -15,6 +16,7 @@ class Direction(PerPacketFeature):
     """
 
     name = "Direction"
+    column = "direction"
 
     @staticmethod
     def min() -> int:
@@ -28,6 +30,9 @@ class Direction(PerPacketFeature):
     def get_value(fid: FlowID, pkt: Pkt) -> int:
         # ignoring port so we can share logic for UDP and TCP
         # TODO: ^ code does NOT appear to ignore port. Is comment or code correct?
+        if isinstance(pkt, RawPkt):
+            return Direction.from_headers(fid, parse_frame(pkt.data, pkt.linktype))
+
         if not pkt.haslayer(scapy.layers.inet.IP):
             return 0
 
@@ -57,6 +62,19 @@ class Direction(PerPacketFeature):
                 else -1
             )
 
+    @staticmethod
+    def from_headers(fid: FlowID, headers: RawHeaders) -> int:
+        """Same as `get_value`, from fields read by `parse_frame`."""
+        if headers.ip_src is None:
+            return 0
+
+        forward = headers.ip_src == fid.sip and headers.ip_dst == fid.dip
+        if headers.proto != Proto.OTHER:
+            forward = (
+                forward and headers.sport == fid.sport and headers.dport == fid.dport
+            )
+        return +1 if forward else -1
+
     @staticmethod
     def clip(val: float) -> float:
         return -1 if val < 0 else 1
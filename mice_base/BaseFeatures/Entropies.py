@@ -1,29 +1,111 @@
-from collections import Counter
 from functools import lru_cache
+from typing import Iterable, Sequence, Union
+
+import numpy as np
 
 # MICE
 from .WindowFeature import windowize
-from ..fe_types import FlowID, Pkt
+from ..fe_types import FlowID, Pkt, Proto, RawPkt
 from .PerPacketFeature import PerPacketFeature
+from .raw_headers import RawHeaders, parse_frame
 
 # scapy
 import scapy.layers.inet
 
-# scipy
-from scipy.stats import entropy
+
+Buffer = Union[bytes, bytearray, memoryview, np.ndarray]
+
+# log2 of every symbol count below _LOG2_TABLE_MAX, grown on demand; entry 0
+# is never used with a non-zero weight.
+_log2_table = np.zeros(1)
+_LOG2_TABLE_MAX = 1 << 20  # larger counts are rare and use np.log2 directly
+_BATCH_CHUNK = 4096  # payloads per bincount, bounds the (chunk, 256) count matrix
+
+
+def _log2_counts(counts: np.ndarray) -> np.ndarray:
+    global _log2_table
+    top = int(counts.max(initial=0))
+    if top >= _LOG2_TABLE_MAX:
+        return np.log2(counts, out=np.zeros(counts.shape), where=counts > 0)
+    table = _log2_table
+    if top >= len(table):
+        size = min(max(top + 1, 2 * len(table), 65536), _LOG2_TABLE_MAX)
+        table = np.zeros(size)
+        np.log2(np.arange(1, size, dtype=np.float64), out=table[1:])
+        # Published only once filled, so concurrent callers never read zeros.
+        _log2_table = table
+    return table[counts]
+
+
+def counts_entropy(counts: np.ndarray) -> np.ndarray:
+    """Shannon entropy in bits of symbol-count histograms along the last axis.
+
+    Computes `sum(c * (log2(n) - log2(c))) / n`, which is exactly 0 for a
+    single symbol and 0 for an empty histogram, like `scipy.stats.entropy`.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    totals = counts.sum(axis=-1)
+    log_totals = _log2_counts(totals)
+    bits = (counts * (log_totals[..., None] - _log2_counts(counts))).sum(axis=-1)
+    return np.divide(bits, totals, out=np.zeros(totals.shape), where=totals > 0)
+
+
+def byte_entropy(buf: Buffer) -> float:
+    """Shannon entropy in bits of the bytes in `buf`."""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    return float(counts_entropy(np.bincount(data, minlength=256)))
+
+
+def batch_byte_entropy(buf: Buffer, offsets: Sequence[int]) -> np.ndarray:
+    """Byte entropy of many payloads stored back to back in one buffer.
+
+    Args:
+        buf (Buffer): The concatenated payloads.
+        offsets (Sequence[int]): `n + 1` increasing offsets into `buf`; payload
+            `i` is `buf[offsets[i]:offsets[i + 1]]`.
+
+    Returns:
+        np.ndarray: The `n` entropies, 0.0 for empty payloads.
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(offsets) - 1
+    result = np.zeros(max(n, 0))
+    for first in range(0, n, _BATCH_CHUNK):
+        last = min(first + _BATCH_CHUNK, n)
+        lengths = np.diff(offsets[first : last + 1])
+        rows = np.repeat(np.arange(last - first), lengths)
+        codes = data[offsets[first] : offsets[last]]
+        counts = np.bincount(
+            (rows << 8) | codes, minlength=(last - first) * 256
+        ).reshape(-1, 256)
+        result[first:last] = counts_entropy(counts)
+    return result
+
+
+def values_entropy(values: Iterable) -> float:
+    """Shannon entropy in bits of the distribution of arbitrary values."""
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return byte_entropy(values)
+    data = np.asarray(values if isinstance(values, np.ndarray) else list(values))
+    if data.size == 0:
+        return 0.0
+    _, counts = np.unique(data, return_counts=True)
+    return float(counts_entropy(counts))
 
 
 class Entropy(PerPacketFeature):
     name = "Entropy"
+    column = "entropy"
 
     @staticmethod
     def entropy(bytelist) -> float:
-        return entropy(list(Counter(bytelist).values()), base=2)
+        return values_entropy(bytelist)
 
     @staticmethod
     @lru_cache(maxsize=2048)
     def _max_entropy(win_size) -> float:
-        return Entropy.entropy([i % 256 for i in range(win_size)])
+        return byte_entropy((np.arange(win_size) % 256).astype(np.uint8))
 
     @staticmethod
     def min() -> float:
@@ -35,6 +117,9 @@ class Entropy(PerPacketFeature):
 
     @staticmethod
     def get_value(fid: FlowID, pkt: Pkt) -> float:
+        if isinstance(pkt, RawPkt):
+            return Entropy.from_headers(fid, parse_frame(pkt.data, pkt.linktype))
+
         if pkt.haslayer(scapy.layers.inet.TCP):
             return Entropy.entropy(pkt.payload[scapy.layers.inet.TCP].original)
         elif pkt.haslayer(scapy.layers.inet.UDP):
@@ -42,6 +127,13 @@ class Entropy(PerPacketFeature):
         else:
             return 0.0
 
+    @staticmethod
+    def from_headers(fid: FlowID, headers: RawHeaders) -> float:
+        """Same as `get_value`, from fields read by `parse_frame`."""
+        if headers.proto == Proto.OTHER:
+            return 0.0
+        return Entropy.entropy(headers.l4)
+
 
 Entropies = windowize(Entropy)
 
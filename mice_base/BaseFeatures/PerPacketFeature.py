@@ -4,6 +4,11 @@ from ..fe_types import FlowID, Pkt
 
 
 class PerPacketFeature(ABC):
+    # Name of the PacketTable column holding this feature, if any.
+    column = None
+    # Value of the padding after the last packet of a short window.
+    fill = 0.0
+
     @staticmethod
     @abstractmethod
     def min():
@@ -7,8 +7,9 @@ import scapy.layers.inet
 # MICE
 from .WindowFeature import windowize
 from .random_round import random_round
-from ..fe_types import FlowID, Pkt
+from ..fe_types import FlowID, Pkt, Proto, RawPkt
 from .PerPacketFeature import PerPacketFeature
+from .raw_headers import RawHeaders, UDP_HEADER_SIZE, parse_frame
 
 
 class Size(PerPacketFeature):
@@ -18,6 +19,7 @@ class Size(PerPacketFeature):
     """
 
     name = "Size"
+    column = "size"
 
     @staticmethod
     def min() -> int:
@@ -29,7 +31,9 @@ class Size(PerPacketFeature):
 
     @staticmethod
     def get_value(fid: Optional[FlowID], pkt: Pkt) -> int:
-        # TODO: would be nice to decouple this from scapy, but not sure it's worth the effort.
+        if isinstance(pkt, RawPkt):
+            return Size.from_headers(fid, parse_frame(pkt.data, pkt.linktype))
+
         if pkt.haslayer(scapy.layers.inet.IP):
             if pkt.haslayer(scapy.layers.inet.TCP):
                 return (
@@ -38,8 +42,19 @@ class Size(PerPacketFeature):
             elif pkt.haslayer(scapy.layers.inet.UDP):
                 UDP_HEADER_SIZE = 8
                 return pkt[scapy.layers.inet.UDP].len - UDP_HEADER_SIZE
-        else:
+        # No IP header, or IP without TCP/UDP, like PacketTable.
+        return 0
+
+    @staticmethod
+    def from_headers(fid: Optional[FlowID], headers: RawHeaders) -> int:
+        """Same as `get_value`, from fields read by `parse_frame`."""
+        if headers.ip_src is None:
             return 0
+        if headers.proto == Proto.TCP:
+            return headers.ip_len - headers.tcp_dataofs
+        elif headers.proto == Proto.UDP:
+            return headers.udp_len - UDP_HEADER_SIZE
+        return 0
 
     @staticmethod
     def clip(val: float) -> float:
@@ -0,0 +1,37 @@
+import math
+
+# MICE
+from .WindowFeature import windowize
+from ..fe_types import FlowID, Pkt
+from .PerPacketFeature import PerPacketFeature
+
+
+class Time(PerPacketFeature):
+    """Capture timestamp of the packet, in seconds
+
+    Windows are padded with NaN rather than 0.0, so the packets of a short
+    window can be told apart from its padding.
+    """
+
+    name = "Time"
+    column = "time"
+    fill = math.nan
+
+    @staticmethod
+    def min() -> float:
+        return 0.0
+
+    @staticmethod
+    def max() -> float:
+        return math.inf
+
+    @staticmethod
+    def get_value(fid: FlowID, pkt: Pkt) -> float:
+        return float(pkt.time)
+
+    @staticmethod
+    def clip(val: float) -> float:
+        return val
+
+
+Times = windowize(Time)
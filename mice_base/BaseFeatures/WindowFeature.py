@@ -1,13 +1,19 @@
 from abc import ABC, abstractmethod
 from functools import lru_cache
-from typing import List, Callable, Optional
+from typing import List, Callable, Optional, Tuple, Union
 
+import numpy as np
 
-from ..fe_types import FlowID, Pkts, FeatureVal, WindowID
+from ..fe_types import FlowID, Pkts, PacketTable, FeatureVal, WindowID
+from ..memo import memoized
 from .PerPacketFeature import PerPacketFeature
 
 
 class WindowFeature(ABC):
+    # Features whose values `derive` computes this feature from, in argument
+    # order. Features without dependencies are computed from packets directly.
+    dependencies: Tuple = ()
+
     @staticmethod
     @abstractmethod
     def min(winsize: int) -> List[float]:
@@ -32,9 +38,21 @@ class WindowFeature(ABC):
     def clip(win_size: int) -> List[Callable]:
         pass
 
+    @staticmethod
+    def derive(win_size: int, *values: List[float]) -> List[float]:
+        """Compute this feature from the values of its `dependencies`."""
+        raise NotImplementedError()
+
+    # Optional vectorized `derive` over many windows at once: takes one
+    # (n_windows, n_values) array per dependency and returns an
+    # (n_windows, n_names) array. Features without one are derived per window.
+    derive_batch: Optional[Callable[..., np.ndarray]] = None
+
 
 def windowize(feature: PerPacketFeature):
     class WindowizedFeature(WindowFeature):
+        per_packet = feature
+
         @staticmethod
         @lru_cache(maxsize=128)
         def min(winsize: int) -> List[FeatureVal]:
@@ -46,9 +64,16 @@ def windowize(feature: PerPacketFeature):
             return [feature.max() for idx in range(winsize)]
 
         @staticmethod
-        @lru_cache(maxsize=128)
-        def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
-            data = [0.0] * win_size
+        @memoized
+        def get_value(
+            fid: Optional[FlowID], pkts: Union[Pkts, PacketTable], win_size: int
+        ) -> List[float]:
+            data = [feature.fill] * win_size
+            if isinstance(pkts, PacketTable):
+                values = getattr(pkts, feature.column)
+                data[: len(values)] = values.tolist()
+                return data
+
             for idx, pkt in enumerate(pkts.data):
                 data[idx] = feature.get_value(fid, pkt)
             return data
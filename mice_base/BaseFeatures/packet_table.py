@@ -0,0 +1,92 @@
+from typing import Optional
+
+import numpy as np
+
+# scapy
+import scapy.layers.inet
+
+# MICE
+from ..fe_types import FlowID, Pkts, PacketTable, Proto, RawPkt
+from .Directions import Direction
+from .Entropies import batch_byte_entropy
+from .Sizes import Size
+from .raw_headers import parse_frame
+
+
+def build_packet_table(
+    fid: Optional[FlowID], pkts: Pkts, name: Optional[str] = None
+) -> PacketTable:
+    """Decode every packet of `pkts` exactly once into a PacketTable.
+
+    The per-packet values are identical to calling `Direction.get_value`,
+    `Size.get_value` and `Entropy.get_value` on each packet, but each packet
+    only has its IP/TCP/UDP layers looked up a single time. `RawPkt` packets
+    are read with `parse_frame` instead of scapy.
+
+    Args:
+        fid (Optional[FlowID]): The flow the packets belong to, used for directions.
+        pkts (Pkts): The packets to decode, usually a whole flow.
+        name (Optional[str]): Name of the resulting table. Defaults to `pkts.name`.
+
+    Returns:
+        PacketTable: One row per packet.
+    """
+    n = len(pkts.data)
+    time = np.zeros(n, dtype=np.float64)
+    direction = np.zeros(n, dtype=np.int8)
+    size = np.zeros(n, dtype=np.int64)
+    entropy = np.zeros(n, dtype=np.float64)
+    proto = np.zeros(n, dtype=np.uint8)
+    # L4 bytes of every TCP/UDP packet, entropies are computed in one batch.
+    payload_rows = []
+    payloads = []
+
+    for idx, pkt in enumerate(pkts.data):
+        time[idx] = float(pkt.time)
+        if isinstance(pkt, RawPkt):
+            headers = parse_frame(pkt.data, pkt.linktype)
+            direction[idx] = Direction.from_headers(fid, headers)
+            size[idx] = Size.from_headers(fid, headers)
+            proto[idx] = headers.proto
+            if headers.proto != Proto.OTHER:
+                payload_rows.append(idx)
+                payloads.append(headers.l4)
+            continue
+
+        ip = pkt.getlayer(scapy.layers.inet.IP)
+        tcp = pkt.getlayer(scapy.layers.inet.TCP)
+        udp = pkt.getlayer(scapy.layers.inet.UDP)
+
+        # Same precedence as Entropy.get_value: TCP first, then UDP.
+        if tcp is not None:
+            proto[idx] = Proto.TCP
+            payload_rows.append(idx)
+            payloads.append(tcp.original)
+        elif udp is not None:
+            proto[idx] = Proto.UDP
+            payload_rows.append(idx)
+            payloads.append(udp.original)
+
+        if ip is None:
+            continue
+
+        # Same precedence as Size.get_value: TCP first, then UDP.
+        if tcp is not None:
+            size[idx] = ip.len - tcp.dataofs
+        elif udp is not None:
+            size[idx] = udp.len - 8
+
+        # Same precedence as Direction.get_value: UDP first, then TCP.
+        l4 = udp if udp is not None else tcp
+        forward = ip.src == fid.sip and ip.dst == fid.dip
+        if l4 is not None:
+            forward = forward and l4.sport == fid.sport and l4.dport == fid.dport
+        direction[idx] = +1 if forward else -1
+
+    offsets = np.zeros(len(payloads) + 1, dtype=np.int64)
+    np.cumsum([len(payload) for payload in payloads], out=offsets[1:])
+    entropy[payload_rows] = batch_byte_entropy(b"".join(payloads), offsets)
+
+    return PacketTable(
+        pkts.name if name is None else name, time, direction, size, entropy, proto
+    )
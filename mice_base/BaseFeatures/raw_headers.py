@@ -0,0 +1,166 @@
+"""
+  Scapy-free extraction of the few header fields the base features need.
+
+  Frames are walked with fixed `struct` offsets instead of being dissected,
+  covering Ethernet, 802.1Q/802.1ad VLAN tags, IPv4 (including IP-in-IP),
+  IPv6 (including its hop-by-hop, routing, fragment and destination option
+  extension headers), TCP and UDP. Anything else (ARP, ICMP, GRE, ...)
+  simply ends the walk, which mirrors what `haslayer` reports for the
+  protocols scapy would not find a TCP/UDP layer in.
+"""
+import socket
+import struct
+from typing import NamedTuple, Optional, Union
+
+# MICE
+from ..fe_types import Proto
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+ETH_HEADER_SIZE = 14
+VLAN_TAG_SIZE = 4
+IPV6_HEADER_SIZE = 40
+TCP_HEADER_SIZE = 20
+UDP_HEADER_SIZE = 8
+
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86DD
+_ETHERTYPES_VLAN = (0x8100, 0x88A8)
+
+_IPPROTO_IPIP = 4
+_IPPROTO_IPV6 = 41
+_IPV6_EXT_HEADERS = (0, 43, 60)  # hop-by-hop, routing, destination options
+_IPV6_FRAGMENT = 44
+
+_u16 = struct.Struct("!H")
+_ipv4 = struct.Struct("!BxHxxHxB")  # version/ihl, total length, flags/frag, proto
+_ports = struct.Struct("!HH")
+_udp_len = struct.Struct("!4xH")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class RawHeaders(NamedTuple):
+    """Header fields of one frame, as scapy would report them.
+
+    `ip_*` describe the first IPv4 header (i.e. `pkt[IP]`) and are None when
+    the frame has none. `l4` is the first TCP or UDP layer including its
+    header and trimmed to the enclosing IP length, i.e. `pkt[TCP].original`.
+    """
+
+    ip_src: Optional[str]
+    ip_dst: Optional[str]
+    ip_len: int
+    proto: Proto  # Proto.TCP/UDP for the first L4 layer found, else Proto.OTHER
+    sport: int
+    dport: int
+    tcp_dataofs: int
+    tcp_flags: int
+    udp_len: int
+    l4: Buffer
+
+
+_NO_HEADERS = RawHeaders(None, None, 0, Proto.OTHER, 0, 0, 0, 0, 0, b"")
+
+
+def parse_frame(data: Buffer, linktype: int = LINKTYPE_ETHERNET) -> RawHeaders:
+    """Read the header fields used by Size, Direction and Entropy from a frame.
+
+    Args:
+        data (Buffer): The raw frame bytes, as captured.
+        linktype (int): The pcap link type of the frame.
+
+    Returns:
+        RawHeaders: The extracted fields. Frames that cannot be decoded yield
+            headers with no IP and no L4 layer.
+    """
+    buf = memoryview(data)
+    end = len(buf)
+
+    if linktype == LINKTYPE_ETHERNET:
+        if end < ETH_HEADER_SIZE:
+            return _NO_HEADERS
+        (ethertype,) = _u16.unpack_from(buf, 12)
+        offset = ETH_HEADER_SIZE
+        while ethertype in _ETHERTYPES_VLAN and offset + VLAN_TAG_SIZE <= end:
+            (ethertype,) = _u16.unpack_from(buf, offset + 2)
+            offset += VLAN_TAG_SIZE
+        if ethertype == _ETHERTYPE_IPV4:
+            version = 4
+        elif ethertype == _ETHERTYPE_IPV6:
+            version = 6
+        else:
+            return _NO_HEADERS
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if end < 1:
+            return _NO_HEADERS
+        offset = 0
+        version = buf[0] >> 4
+    else:
+        return _NO_HEADERS
+
+    ip_src = ip_dst = None
+    ip_len = 0
+    while True:
+        if version == 4:
+            if offset + 20 > end:
+                break
+            ver_ihl, total_len, frag, nh = _ipv4.unpack_from(buf, offset)
+            header_len = (ver_ihl & 0x0F) << 2
+            if ip_src is None:
+                ip_src = socket.inet_ntoa(buf[offset + 12 : offset + 16])
+                ip_dst = socket.inet_ntoa(buf[offset + 16 : offset + 20])
+                ip_len = total_len
+            if total_len >= header_len:
+                end = min(end, offset + total_len)
+            offset += header_len
+            if frag & 0x1FFF and nh != _IPPROTO_IPV6:
+                break
+        elif version == 6:
+            if offset + IPV6_HEADER_SIZE > end:
+                break
+            (plen,) = _u16.unpack_from(buf, offset + 4)
+            nh = buf[offset + 6]
+            if plen or nh != 0:  # plen 0 with hop-by-hop is a jumbogram
+                end = min(end, offset + IPV6_HEADER_SIZE + plen)
+            offset += IPV6_HEADER_SIZE
+            while offset + 8 <= end:
+                if nh in _IPV6_EXT_HEADERS:
+                    nh, ext_len = buf[offset], buf[offset + 1]
+                    offset += (ext_len + 1) * 8
+                elif nh == _IPV6_FRAGMENT:
+                    (frag,) = _u16.unpack_from(buf, offset + 2)
+                    if frag >> 3:
+                        nh = None
+                        break
+                    nh = buf[offset]
+                    offset += 8
+                else:
+                    break
+        else:
+            break
+
+        if nh == _IPPROTO_IPIP:
+            version = 4
+        elif nh == _IPPROTO_IPV6:
+            version = 6
+        elif nh == Proto.TCP and offset + TCP_HEADER_SIZE <= end:
+            sport, dport = _ports.unpack_from(buf, offset)
+            return RawHeaders(
+                ip_src, ip_dst, ip_len, Proto.TCP, sport, dport,
+                buf[offset + 12] >> 4, buf[offset + 13], 0, buf[offset:end],
+            )
+        elif nh == Proto.UDP and offset + UDP_HEADER_SIZE <= end:
+            sport, dport = _ports.unpack_from(buf, offset)
+            (udp_len,) = _udp_len.unpack_from(buf, offset)
+            return RawHeaders(
+                ip_src, ip_dst, ip_len, Proto.UDP, sport, dport,
+                0, 0, udp_len, buf[offset:end],
+            )
+        else:
+            break
+
+    return RawHeaders(ip_src, ip_dst, ip_len, Proto.OTHER, 0, 0, 0, 0, 0, b"")
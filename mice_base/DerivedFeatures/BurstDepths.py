@@ -2,11 +2,15 @@ from functools import lru_cache
 from statistics import mean, stdev, variance
 from typing import List
 
+import numpy as np
+
 # MICE
 from ..fe_types import FlowID, Pkts, FeatureVal
+from ..memo import memoized
 from ..BaseFeatures.Directions import Directions
 from ..BaseFeatures.WindowFeature import WindowFeature
 from ..BaseFeatures.random_round import random_round
+from .bursts import burst_depths
 from .summary import summary
 from ..BaseFeatures.Entropies import Entropy
 from .topN import topN
@@ -19,24 +23,20 @@ class BurstDepths(WindowFeature):
     a.k.a since the last reverse packet, how many packets in this direction have come before this packet
     """
 
+    dependencies = (Directions,)
+
     @staticmethod
-    @lru_cache(maxsize=128)
+    @memoized
     def get_value(fid: FlowID, pkts: Pkts, win_size: int) -> List[FeatureVal]:
-        since_fwd = 0
-        since_bwd = 0
-        burst_depths: List[int] = [0.0] * win_size
-        directions = Directions.get_value(fid, pkts, win_size)
-        for idx, direction in enumerate(directions):
-            if direction > 0:
-                burst_depths[idx] = since_bwd
-                since_bwd -= 1
-                since_fwd = 0
-            elif direction < 0:
-                burst_depths[idx] = since_fwd
-                since_fwd += 1
-                since_bwd = 0
+        return BurstDepths.derive(win_size, Directions.get_value(fid, pkts, win_size))
 
-        return burst_depths
+    @staticmethod
+    def derive(win_size: int, directions: List[float]) -> List[FeatureVal]:
+        return burst_depths([directions])[0].tolist()
+
+    @staticmethod
+    def derive_batch(win_size: int, directions: np.ndarray) -> np.ndarray:
+        return burst_depths(directions)
 
     @staticmethod
     @lru_cache(maxsize=128)
@@ -2,10 +2,14 @@ from functools import lru_cache
 from statistics import mean, stdev, variance
 from typing import List
 
+import numpy as np
+
 # MICE
 from ..fe_types import FlowID, Pkts, FeatureVal
+from ..memo import memoized
 from ..BaseFeatures.Directions import Directions
 from ..BaseFeatures.WindowFeature import WindowFeature
+from .bursts import segment
 from .summary import summary
 from ..BaseFeatures.Entropies import Entropy
 from .topN import topN
@@ -14,28 +18,26 @@ from ..BaseFeatures.Sizes import Size, Sizes
 
 
 class DirSignBurstBytes(WindowFeature):
+    dependencies = (Directions, Sizes)
+
     @staticmethod
-    @lru_cache(maxsize=128)
+    @memoized
     def get_value(fid: FlowID, pkts: Pkts, win_size: int) -> List[FeatureVal]:
-        burst_bytes = [0.0] * win_size
-        directions = Directions.get_value(fid, pkts, win_size)
-        sizes = Sizes.get_value(fid, pkts, win_size)
+        return DirSignBurstBytes.derive(
+            win_size,
+            Directions.get_value(fid, pkts, win_size),
+            Sizes.get_value(fid, pkts, win_size),
+        )
 
-        cur_dir = 0
-        cur_sum = 0
-        burst_count = 0
-        for idx, direction in enumerate(directions):
-            if direction == cur_dir:
-                cur_sum += sizes[idx]
-            else:
-                if cur_dir != 0:
-                    burst_bytes[burst_count] = cur_dir * cur_sum
-                    burst_count += 1
-
-                cur_sum = sizes[idx]
-                cur_dir = direction
+    @staticmethod
+    def derive(
+        win_size: int, directions: List[float], sizes: List[float]
+    ) -> List[FeatureVal]:
+        return DirSignBurstBytes.derive_batch(win_size, [directions], [sizes])[0].tolist()
 
-        return burst_bytes
+    @staticmethod
+    def derive_batch(win_size: int, directions: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        return segment(directions, sizes).bytes
 
     @staticmethod
     @lru_cache(maxsize=128)
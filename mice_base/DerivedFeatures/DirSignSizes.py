@@ -6,9 +6,12 @@ from ..BaseFeatures.Sizes import Size, Sizes
 from ..BaseFeatures.Directions import Directions
 from ..BaseFeatures.WindowFeature import WindowFeature
 from ..fe_types import FlowID, Pkts
+from ..memo import memoized
 
 
 class DirSignSizes(WindowFeature):
+    dependencies = (Directions, Sizes)
+
     @staticmethod
     @lru_cache(maxsize=128)
     def min(winsize: int) -> List[float]:
@@ -24,14 +27,17 @@ class DirSignSizes(WindowFeature):
         return [dirs[idx] * sizes[idx] for idx in range(winsize)]
 
     @staticmethod
-    @lru_cache(maxsize=128)
+    @memoized
     def get_value(fid: FlowID, pkts: Pkts, win_size: int) -> List[float]:
-        data = [0.0] * win_size
-        dirs = Directions.get_value(fid, pkts, win_size)
-        sizes = Sizes.get_value(fid, pkts, win_size)
-        for idx, _ in enumerate(pkts.data):
-            data[idx] = dirs[idx] * sizes[idx]
-        return data
+        return DirSignSizes.derive(
+            win_size,
+            Directions.get_value(fid, pkts, win_size),
+            Sizes.get_value(fid, pkts, win_size),
+        )
+
+    @staticmethod
+    def derive(win_size: int, dirs: List[float], sizes: List[float]) -> List[float]:
+        return [dirs[idx] * sizes[idx] for idx in range(win_size)]
 
     @staticmethod
     @lru_cache(maxsize=128)
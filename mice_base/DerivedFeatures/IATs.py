@@ -1,19 +1,56 @@
 from functools import lru_cache
-from typing import List, Callable
+from typing import List, Callable, Union
 from statistics import mean, stdev, variance
 
+import numpy as np
+
 # MICE
 from ..BaseFeatures.WindowFeature import WindowFeature
-from ..fe_types import FlowID, Pkts
-from ..BaseFeatures.Directions import Direction
+from ..fe_types import FlowID, Pkts, PacketTable
+from ..memo import memoized
+from ..BaseFeatures.Directions import Directions
+from ..BaseFeatures.Times import Times
 from ..BaseFeatures.random_round import random_round
 from .topN import topN
 from .hist import hist
 from .summary import summary
 from ..BaseFeatures.Entropies import Entropy
 
+def inter_arrival_times(times: np.ndarray, directions: np.ndarray) -> np.ndarray:
+    """Time since the previous packet in the same direction, per packet.
+
+    Packets with a positive direction are forward and all others backward.
+    The first packet of each direction, and the NaN-timed padding of a short
+    window, get 0.0.
+
+    Args:
+        times (np.ndarray): An (n_windows, win_size) array of timestamps.
+        directions (np.ndarray): The directions of the same packets.
+
+    Returns:
+        np.ndarray: An (n_windows, win_size) array.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    forward = np.asarray(directions) > 0
+    valid = ~np.isnan(times)
+    positions = np.broadcast_to(np.arange(times.shape[1]), times.shape)
+
+    iats = np.zeros(times.shape)
+    for mask in (valid & forward, valid & ~forward):
+        # Position of the latest packet of this direction before each packet.
+        last = np.maximum.accumulate(np.where(mask, positions, -1), axis=1)
+        previous = np.full(times.shape, -1)
+        previous[:, 1:] = last[:, :-1]
+        has_previous = mask & (previous >= 0)
+        previous_times = np.take_along_axis(times, np.maximum(previous, 0), axis=1)
+        iats[has_previous] = (times - previous_times)[has_previous]
+    return iats
+
+
 # TODO: Inter-Arrival Times?
 class IATs(WindowFeature):
+    dependencies = (Times, Directions)
+
     @staticmethod
     @lru_cache(maxsize=128)
     def min(winsize: int) -> List[float]:
@@ -25,28 +62,23 @@ class IATs(WindowFeature):
         return [1.0] * winsize
 
     @staticmethod
-    @lru_cache(maxsize=128)
-    def get_value(fid: FlowID, pkts: Pkts, win_size: int) -> List[float]:
-        last_fwd = None
-        last_bwd = None
-        values: List[float] = [0.0] * win_size
-        for idx, pkt in enumerate(pkts):
-            if Direction.get_value(fid, pkt) > 0:
-                if last_fwd is None:
-                    last_fwd = pkt.time
-                else:
-                    new_time = pkt.time
-                    values[idx] = new_time - last_fwd
-                    last_fwd = new_time
-            else:  # Backward
-                if last_bwd is None:
-                    last_bwd = pkt.time
-                else:
-                    new_time = pkt.time
-                    values[idx] = new_time - last_bwd
-                    last_bwd = new_time
-
-        return values
+    @memoized
+    def get_value(
+        fid: FlowID, pkts: Union[Pkts, PacketTable], win_size: int
+    ) -> List[float]:
+        return IATs.derive(
+            win_size,
+            Times.get_value(fid, pkts, win_size),
+            Directions.get_value(fid, pkts, win_size),
+        )
+
+    @staticmethod
+    def derive(win_size: int, times: List[float], directions: List[float]) -> List[float]:
+        return inter_arrival_times([times], [directions])[0].tolist()
+
+    @staticmethod
+    def derive_batch(win_size: int, times: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        return inter_arrival_times(times, directions)
 
     @staticmethod
     @lru_cache(maxsize=128)
@@ -4,6 +4,7 @@ from typing import List
 
 # MICE
 from ..fe_types import FlowID, Pkts, FeatureVal
+from ..memo import memoized
 from ..BaseFeatures.Directions import Directions
 from ..BaseFeatures.WindowFeature import WindowFeature
 from .summary import SumSizes
@@ -16,12 +17,16 @@ from .DirSignSizes import DirSignSizes
 
 
 class TotalFwdBytes(WindowFeature):
+    dependencies = (DirSignSizes,)
+
     @staticmethod
-    @lru_cache(maxsize=128)
+    @memoized
     def get_value(fid: FlowID, pkts: Pkts, win_size: int) -> List[FeatureVal]:
-        return [
-            sum([val for val in DirSignSizes.get_value(fid, pkts, win_size) if val > 0])
-        ]
+        return TotalFwdBytes.derive(win_size, DirSignSizes.get_value(fid, pkts, win_size))
+
+    @staticmethod
+    def derive(win_size: int, dir_sign_sizes: List[float]) -> List[FeatureVal]:
+        return [sum([val for val in dir_sign_sizes if val > 0])]
 
     @staticmethod
     @lru_cache(maxsize=128)
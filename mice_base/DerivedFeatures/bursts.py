@@ -0,0 +1,102 @@
+"""
+  Run-length segmentation of window directions into bursts
+
+  A burst is a run of consecutive packets in the same direction. `segment`
+  finds the run boundaries of many windows at once, and everything the burst
+  features need is computed from that one segmentation.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class Bursts(NamedTuple):
+    """Bursts of an (n_windows, win_size) array of directions.
+
+    Only completed bursts are counted: a burst ends when the direction
+    changes, so the last run of a window, and runs of direction 0, are not
+    bursts.
+    """
+
+    bytes: np.ndarray  # (n_windows, win_size) signed bytes per burst, left-aligned
+    lengths: np.ndarray  # (n_windows, win_size) packets per burst, left-aligned
+    counts: np.ndarray  # (n_windows,) number of bursts
+    depths: np.ndarray  # (n_windows, win_size) per-packet burst depths, see `burst_depths`
+
+
+def burst_depths(directions: np.ndarray) -> np.ndarray:
+    """How many packets of a burst came before each packet.
+
+    Packets of direction 0 neither end nor join a burst and have depth 0.
+    Depths of forward packets are negative and those of backward packets
+    positive, i.e. 0, -1, -2, ... and 0, 1, 2, ...
+
+    Args:
+        directions (np.ndarray): An (n_windows, win_size) array.
+
+    Returns:
+        np.ndarray: An (n_windows, win_size) array.
+    """
+    directions = np.asarray(directions, dtype=np.float64)
+    signs = np.sign(directions)
+    nonzero = signs != 0
+    width = signs.shape[1]
+    positions = np.broadcast_to(np.arange(width), signs.shape)
+
+    # Direction of the previous non-zero packet of the window, if any.
+    last = np.maximum.accumulate(np.where(nonzero, positions, -1), axis=1)
+    previous = np.full(signs.shape, -1)
+    previous[:, 1:] = last[:, :-1]
+    previous_signs = np.where(
+        previous >= 0, np.take_along_axis(signs, np.maximum(previous, 0), axis=1), 0
+    )
+
+    starts = nonzero & (signs != previous_signs)
+    seen = np.cumsum(nonzero, axis=1)
+    start = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    depth = seen - np.take_along_axis(seen, start, axis=1)
+    return np.where(signs > 0, -depth, np.where(signs < 0, depth, 0)).astype(np.float64)
+
+
+def segment(directions: np.ndarray, sizes: Optional[np.ndarray] = None) -> Bursts:
+    """Bursts of every window of `directions`.
+
+    Args:
+        directions (np.ndarray): An (n_windows, win_size) array.
+        sizes (Optional[np.ndarray]): Sizes of the same packets. Without them,
+            `Bursts.bytes` is all zeros.
+
+    Returns:
+        Bursts: The bursts of every window.
+    """
+    directions = np.asarray(directions, dtype=np.float64)
+    n_rows, width = directions.shape
+    burst_bytes = np.zeros((n_rows, width))
+    lengths = np.zeros((n_rows, width))
+    counts = np.zeros(n_rows, dtype=np.int64)
+    if directions.size == 0:
+        return Bursts(burst_bytes, lengths, counts, np.zeros((n_rows, width)))
+
+    flat = directions.ravel()
+    starts = np.ones(flat.shape, dtype=bool)
+    starts[1:] = flat[1:] != flat[:-1]
+    starts[::width] = True
+    run_starts = np.flatnonzero(starts)
+    run_rows = run_starts // width
+    run_dirs = flat[run_starts]
+    run_lengths = np.diff(np.append(run_starts, flat.size))
+
+    last_run = np.append(run_rows[1:] != run_rows[:-1], True)
+    bursts = ~last_run & (run_dirs != 0)
+    rows = run_rows[bursts]
+    # Position of each burst among the bursts of its window.
+    columns = np.arange(len(rows)) - np.searchsorted(rows, rows, "left")
+
+    lengths[rows, columns] = run_lengths[bursts]
+    counts += np.bincount(rows, minlength=n_rows)
+    if sizes is not None:
+        sums = np.add.reduceat(np.asarray(sizes, dtype=np.float64).ravel(), run_starts)
+        # Adding 0.0 turns the -0.0 of empty backward bursts into 0.0.
+        burst_bytes[rows, columns] = run_dirs[bursts] * sums[bursts] + 0.0
+
+    return Bursts(burst_bytes, lengths, counts, burst_depths(directions))
@@ -1,17 +1,51 @@
 from functools import lru_cache
-import math
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+import numpy as np
 
 # MICE
 from ..fe_types import FlowID, Pkts, FeatureVal
+from ..memo import memoized
 from ..BaseFeatures.WindowFeature import WindowFeature
 from ..BaseFeatures.random_round import random_round
 from ..BaseFeatures.Sizes import Sizes, Size
 from ..BaseFeatures.Entropies import Entropies
 
 
+def bucket_index(values: np.ndarray, buckets: Sequence[float]) -> np.ndarray:
+    """Bucket of each value.
+
+    A value is counted in the first bucket whose successor is not below it,
+    i.e. bucket `i` holds `buckets[i] < val <= buckets[i + 1]`, with values up
+    to `buckets[1]` in the first bucket and values above `buckets[-1]` in the
+    last one. NaNs are counted in the first bucket.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    idx = np.searchsorted(np.asarray(buckets[1:], dtype=np.float64), values, "left")
+    idx[np.isnan(values)] = 0
+    return idx
+
+
+def bucket_counts(values: np.ndarray, buckets: Sequence[float]) -> np.ndarray:
+    """Histogram of each row of an (n_windows, win_size) array, see `bucket_index`.
+
+    Returns:
+        np.ndarray: An (n_windows, len(buckets)) array of counts.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, width = values.shape
+    idx = bucket_index(values, buckets)
+    idx += np.arange(n_rows)[:, None] * len(buckets)
+    counts = np.bincount(idx.ravel(), minlength=n_rows * len(buckets))
+    return counts.reshape(n_rows, len(buckets)).astype(np.float64)
+
+
 def hist(feature, buckets):
     class Hist(WindowFeature):
+        dependencies = (feature,)
+        source = feature
+        bins = buckets
+
         @staticmethod
         @lru_cache(maxsize=128)
         def min(winsize: int) -> List[FeatureVal]:
@@ -23,21 +57,17 @@ def hist(feature, buckets):
             return [winsize] * len(buckets)
 
         @staticmethod
-        @lru_cache(maxsize=128)
+        @memoized
         def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
-            results = [0.0] * len(buckets)
-            data = sorted(feature.get_value(fid, pkts, win_size))
-            keys = buckets + [math.inf]
-            cur_idx = 0
-            upper_idx = keys[cur_idx + 1]
-            for val in data:
-                while val > upper_idx and cur_idx < len(keys) - 2:
-                    cur_idx += 1
-                    upper_idx = keys[cur_idx + 1]
-
-                results[cur_idx] += 1
-
-            return results
+            return Hist.derive(win_size, feature.get_value(fid, pkts, win_size))
+
+        @staticmethod
+        def derive(win_size: int, values: List[float]) -> List[float]:
+            return bucket_counts([values], buckets)[0].tolist()
+
+        @staticmethod
+        def derive_batch(win_size: int, values: np.ndarray) -> np.ndarray:
+            return bucket_counts(values, buckets)
 
         @staticmethod
         @lru_cache(maxsize=128)
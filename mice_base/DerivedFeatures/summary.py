@@ -2,15 +2,128 @@ from functools import lru_cache
 from statistics import mean, stdev, variance
 from typing import List, Optional
 
+import numpy as np
+
 # MICE
 from ..BaseFeatures.WindowFeature import WindowFeature
 from ..fe_types import FlowID, FeatureVal, Pkts
+from ..memo import memoized
 from ..BaseFeatures.Sizes import Sizes
 from ..BaseFeatures.Entropies import Entropy, Entropies
 
 
+# Statistics computed by `summarize`, in column order.
+STATS = ("max", "min", "sum", "mean", "stdev", "variance", "entropy")
+
+_STAT_FUNCS = {
+    max: "max",
+    min: "min",
+    sum: "sum",
+    mean: "mean",
+    stdev: "stdev",
+    variance: "variance",
+    Entropy.entropy: "entropy",
+}
+
+
+def _row_entropy(values: np.ndarray) -> np.ndarray:
+    """Entropy in bits of the distribution of values in each row."""
+    n_rows, width = values.shape
+    ordered = np.sort(values, axis=1)
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    run_starts = np.flatnonzero(starts)
+    counts = np.diff(np.append(run_starts, n_rows * width))
+    bits = counts * (np.log2(width) - np.log2(counts))
+    return np.bincount(run_starts // width, weights=bits, minlength=n_rows) / width
+
+
+def summarize(values: np.ndarray) -> np.ndarray:
+    """Every statistic in STATS for each row of an (n_windows, win_size) array.
+
+    stdev and variance are sample statistics like `statistics.stdev` and
+    `statistics.variance`, and are 0.0 for rows of fewer than two values.
+
+    Returns:
+        np.ndarray: An (n_windows, len(STATS)) array.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, width = values.shape
+    result = np.zeros((n_rows, len(STATS)))
+    if width == 0:
+        return result
+
+    result[:, 0] = values.max(axis=1)
+    result[:, 1] = values.min(axis=1)
+    result[:, 2] = values.sum(axis=1)
+    result[:, 3] = values.mean(axis=1)
+    if width > 1:
+        deviations = values - result[:, 3:4]
+        np.einsum("ij,ij->i", deviations, deviations, out=result[:, 5])
+        result[:, 5] /= width - 1
+        np.sqrt(result[:, 5], out=result[:, 4])
+    result[:, 6] = _row_entropy(values)
+    return result
+
+
+@lru_cache(maxsize=None)
+def summary_stats(feature):
+    """Intermediate feature holding every statistic in STATS of `feature`.
+
+    All `summary(feature, ...)` features of a known statistic depend on it, so
+    a FeaturePlan computes the statistics of a window in a single pass.
+    """
+
+    class SummaryStats(WindowFeature):
+        dependencies = (feature,)
+
+        @staticmethod
+        def min(winsize: int) -> List[FeatureVal]:
+            return [0.0] * len(STATS)
+
+        @staticmethod
+        def max(winsize: int) -> List[FeatureVal]:
+            return [0.0] * len(STATS)
+
+        @staticmethod
+        @memoized
+        def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
+            return SummaryStats.derive(win_size, feature.get_value(fid, pkts, win_size))
+
+        @staticmethod
+        def derive(win_size: int, values: List[float]) -> List[float]:
+            return summarize([values])[0].tolist()
+
+        @staticmethod
+        def derive_batch(win_size: int, values: np.ndarray) -> np.ndarray:
+            return summarize(values)
+
+        @staticmethod
+        @lru_cache(maxsize=128)
+        def get_names(win_size: int) -> List[str]:
+            suffix = feature.get_names(win_size)[0][3:]
+            return [f"{stat.capitalize()}{suffix}" for stat in STATS]
+
+        @staticmethod
+        def clip(win_size: int) -> float:
+            return [lambda x: x] * len(STATS)
+
+    return SummaryStats
+
+
 def summary(feature, func, max=0.0):
+    stat = _STAT_FUNCS.get(func)
+    if stat is None:
+        return _summary(feature, func, max)
+
+    stats = summary_stats(feature)
+    column = STATS.index(stat)
+
     class Summary(WindowFeature):
+        dependencies = (stats,)
+        source = feature
+        statistic = stat
+
         @staticmethod
         @lru_cache(maxsize=128)
         def min(winsize: int) -> List[FeatureVal]:
@@ -21,13 +134,56 @@ def summary(feature, func, max=0.0):
         def max(winsize: int) -> List[FeatureVal]:
             return [max]
 
+        @staticmethod
+        def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
+            return Summary.derive(win_size, stats.get_value(fid, pkts, win_size))
+
+        @staticmethod
+        def derive(win_size: int, values: List[float]) -> List[float]:
+            return [values[column]]
+
+        @staticmethod
+        def derive_batch(win_size: int, values: np.ndarray) -> np.ndarray:
+            return values[:, column : column + 1]
+
+        @staticmethod
+        @lru_cache(maxsize=128)
+        def get_names(win_size: int) -> List[str]:
+            return [f"{func.__name__.capitalize()}{feature.get_names(win_size)[0][3:]}"]
+
+        @staticmethod
+        def clip(win_size: int) -> float:
+            return [lambda x: x]
+
+    return Summary
+
+
+def _summary(feature, func, max=0.0):
+    """Summary by an arbitrary function of the window's values."""
+
+    class Summary(WindowFeature):
+        dependencies = (feature,)
+        source = feature
+        statistic = None
+
+        @staticmethod
+        @lru_cache(maxsize=128)
+        def min(winsize: int) -> List[FeatureVal]:
+            return [0.0]
+
         @staticmethod
         @lru_cache(maxsize=128)
+        def max(winsize: int) -> List[FeatureVal]:
+            return [max]
+
+        @staticmethod
+        @memoized
         def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
-            try:
-                return [func([float(v) for v in feature.get_value(fid, pkts)])]
-            except:
-                return [0.0]
+            return Summary.derive(win_size, feature.get_value(fid, pkts, win_size))
+
+        @staticmethod
+        def derive(win_size: int, values: List[float]) -> List[float]:
+            return [func([float(v) for v in values])]
 
         @staticmethod
         @lru_cache(maxsize=128)
@@ -1,52 +1,74 @@
 from functools import lru_cache
 from typing import List, Optional
 
+import numpy as np
+
 # MICE
 from ..fe_types import FlowID, Pkts, FeatureVal
+from ..memo import memoized
 from ..BaseFeatures.WindowFeature import WindowFeature
 from ..BaseFeatures.Sizes import Sizes
 from ..BaseFeatures.Entropies import Entropy, Entropies
 
 
+def top_n(values: np.ndarray, n: int, bottom: bool = False) -> np.ndarray:
+    """The `n` largest (or smallest) values of each row, in ascending order.
+
+    Rows of fewer than `n` values are padded with trailing zeros.
+
+    Args:
+        values (np.ndarray): An (n_windows, win_size) array.
+        n (int): Number of values kept per row.
+        bottom (bool): Keep the smallest values instead of the largest.
+
+    Returns:
+        np.ndarray: An (n_windows, n) array.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, width = values.shape
+    k = min(n, width)
+    if k < width:
+        # Only the kept values need to be sorted.
+        kth = k - 1 if bottom else width - k
+        values = np.partition(values, kth, axis=1)
+        values = values[:, :k] if bottom else values[:, width - k :]
+    result = np.zeros((n_rows, n))
+    result[:, :k] = np.sort(values, axis=1)
+    return result
+
+
 def topN(feature, n=5, bottom=False):
     class TopN(WindowFeature):
+        dependencies = (feature,)
+
         @staticmethod
         def _get_top_n(data):
-            if bottom:
-                data.sort()
-                return data[:n]
-            else:
-                data.sort()
-                return data[-n:]
+            return top_n([data], n, bottom)[0].tolist()
 
+        # The k-th largest (smallest) value of a window is bounded by the k-th
+        # largest (smallest) of the per-packet bounds of `feature`.
         @staticmethod
         @lru_cache(maxsize=128)
         def min(winsize: int) -> List[FeatureVal]:
-            if bottom:
-                return _get_top_n([feature.max() for idx in range(winsize)])
-            else:
-                return _get_top_n([feature.min() for idx in range(winsize)])
+            return TopN._get_top_n(feature.min(winsize))
 
         @staticmethod
         @lru_cache(maxsize=128)
         def max(winsize: int) -> List[FeatureVal]:
-            # TODO
-            if bottom:
-                return _get_top_n([feature.min() for idx in range(winsize)])
-            else:
-                return _get_top_n([feature.max() for idx in range(winsize)])
+            return TopN._get_top_n(feature.max(winsize))
 
         @staticmethod
-        @lru_cache(maxsize=128)
+        @memoized
         def get_value(fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
-            result = [0.0] * n
-            data = TopN._get_top_n(
-                [float(v) for v in feature.get_value(fid, pkts, win_size)]
-            )
-            for idx, value in enumerate(data):
-                result[idx] = value
-
-            return result
+            return TopN.derive(win_size, feature.get_value(fid, pkts, win_size))
+
+        @staticmethod
+        def derive(win_size: int, values: List[float]) -> List[float]:
+            return TopN._get_top_n(values)
+
+        @staticmethod
+        def derive_batch(win_size: int, values: np.ndarray) -> np.ndarray:
+            return top_n(values, n, bottom)
 
         @staticmethod
         @lru_cache(maxsize=128)
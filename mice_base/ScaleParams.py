@@ -1,4 +1,5 @@
-from typing import NamedTuple
+from collections import OrderedDict
+from typing import Hashable, Iterable, NamedTuple, Optional, Tuple
 
 import numpy as np
 
@@ -8,17 +9,178 @@ class ScaleParams(NamedTuple):
     std: np.array
     eps: float
 
-    def scale(self, data, idx=None):
-        if idx is None:
-            return (data - self.mu) / (self.std + self.eps)
+    def scale(self, data, idx=None, out=None):
+        """`(data - mu) / (std + eps)`, written into `out` if given, which may be `data`."""
+        mu, std = (self.mu, self.std) if idx is None else (self.mu[idx], self.std[idx])
+        if out is None:
+            return (data - mu) / (std + self.eps)
+        np.subtract(data, mu, out=out)
+        return np.divide(out, std + self.eps, out=out)
+
+    def descale(self, data, idx=None, out=None):
+        """`data * (std + eps) + mu`, written into `out` if given, which may be `data`."""
+        mu, std = (self.mu, self.std) if idx is None else (self.mu[idx], self.std[idx])
+        if out is None:
+            return (data * (std + self.eps)) + mu
+        np.multiply(data, std + self.eps, out=out)
+        return np.add(out, mu, out=out)
+
+    def batch(self, dtype=np.float64) -> "BatchScaler":
+        """A BatchScaler of these parameters, see BatchScaler."""
+        return BatchScaler(self, dtype)
+
+    def to_json(self):
+        return {"mu": self.mu.tolist(), "std": self.std.tolist(), "eps": self.eps}
+
+    def save(self, path) -> None:
+        """Write the parameters in the `.npz` format to `path` as given, without
+        the `.npz` suffix `np.savez` would append, see `load`."""
+        if isinstance(path, (str, bytes)) or hasattr(path, "__fspath__"):
+            with open(path, "wb") as f:
+                np.savez(f, mu=self.mu, std=self.std, eps=self.eps)
         else:
-            return (data - self.mu[idx]) / (self.std[idx] + self.eps)
+            np.savez(path, mu=self.mu, std=self.std, eps=self.eps)
+
+    @classmethod
+    def load(cls, path) -> "ScaleParams":
+        with np.load(path) as params:
+            return cls(params["mu"], params["std"], float(params["eps"]))
 
-    def descale(self, data, idx=None):
+
+class BatchScaler:
+    """Scales `(n_samples, n_features)` matrices with one ScaleParams.
+
+    The `mu` and `std + eps` of every column subset `idx` scaled are kept, cast
+    to `dtype`, so repeated calls do no indexing and no recomputation.
+
+    Usage:
+        ```
+        scaler = params.batch(np.float32)
+        batch = scaler.scale(samples, out=buffer)  # (n_samples, n_features)
+        ```
+
+    Args:
+        params (ScaleParams): The parameters.
+        dtype: dtype of the results, e.g. `np.float32`.
+        max_subsets (int): Number of column subsets whose vectors are kept.
+    """
+
+    def __init__(self, params: ScaleParams, dtype=np.float64, max_subsets: int = 64):
+        self.params = params
+        self.dtype = np.dtype(dtype)
+        self.max_subsets = max_subsets
+        self._subsets: "OrderedDict[Hashable, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+    @staticmethod
+    def _key(idx) -> Hashable:
         if idx is None:
-            return (data * (self.std + self.eps)) + self.mu
+            return None
+        if isinstance(idx, slice):
+            return ("slice", idx.start, idx.stop, idx.step)
+        idx = np.asarray(idx)
+        return (idx.dtype.str, idx.shape, idx.tobytes())
+
+    def columns(self, idx=None) -> Tuple[np.ndarray, np.ndarray]:
+        """`mu` and `std + eps` of the columns `idx`, in `dtype`."""
+        key = self._key(idx)
+        vectors = self._subsets.get(key)
+        if vectors is None:
+            mu, std = self.params.mu, self.params.std
+            if idx is not None:
+                mu, std = mu[idx], std[idx]
+            vectors = (
+                np.ascontiguousarray(mu, dtype=self.dtype),
+                np.ascontiguousarray(std + self.params.eps, dtype=self.dtype),
+            )
+            self._subsets[key] = vectors
+            if len(self._subsets) > self.max_subsets:
+                self._subsets.popitem(last=False)
         else:
-            return (data * (self.std[idx] + self.eps)) + self.mu[idx]
+            self._subsets.move_to_end(key)
+        return vectors
 
-    def to_json(self):
-        return {"mu": self.mu.tolist(), "std": self.std.tolist(), "eps": self.eps}
+    def _out(self, data: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        return np.empty(np.shape(data), dtype=self.dtype) if out is None else out
+
+    def scale(self, data: np.ndarray, idx=None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scale every row of `data`, into `out` if given, which may be `data`."""
+        mu, denominator = self.columns(idx)
+        out = self._out(data, out)
+        np.subtract(data, mu, out=out)
+        return np.divide(out, denominator, out=out)
+
+    def descale(self, data: np.ndarray, idx=None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Descale every row of `data`, into `out` if given, which may be `data`."""
+        mu, denominator = self.columns(idx)
+        out = self._out(data, out)
+        np.multiply(data, denominator, out=out)
+        return np.add(out, mu, out=out)
+
+
+class ScaleFitter:
+    """Fits ScaleParams over chunks of feature rows, without holding them all.
+
+    Every chunk is reduced to its row count, mean and sum of squared
+    deviations, which are combined with those of the previous chunks using
+    Chan et al.'s parallel update. Fitters fed different rows, e.g. by
+    different workers, can be combined with `merge`.
+
+    Usage:
+        ```
+        fitter = ScaleFitter()
+        for chunk in chunks:  # (n_rows, n_features) arrays
+            fitter.update(chunk)
+        scaler = fitter.finalize(eps=1e-8)
+        ```
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean: Optional[np.ndarray] = None
+        self.m2: Optional[np.ndarray] = None  # sums of squared deviations from the mean
+
+    def update(self, rows: np.ndarray) -> "ScaleFitter":
+        """Add a chunk of rows, an (n_rows, n_features) array."""
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows[None, :]
+        if len(rows) == 0:
+            return self
+        mean = rows.mean(axis=0)
+        deviations = rows - mean
+        m2 = np.einsum("ij,ij->j", deviations, deviations)
+        return self._combine(len(rows), mean, m2)
+
+    def merge(self, other: "ScaleFitter") -> "ScaleFitter":
+        """Add the rows `other` was fitted on."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray) -> "ScaleFitter":
+        if not self.count:
+            self.count, self.mean, self.m2 = count, mean.copy(), m2.copy()
+            return self
+        if mean.shape != self.mean.shape:
+            raise ValueError(f"Rows have {mean.shape[0]} features, expected {self.mean.shape[0]}")
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * (count / total)
+        self.m2 += m2 + delta ** 2 * (self.count * count / total)
+        self.count = total
+        return self
+
+    def finalize(self, eps: float = 1e-8) -> ScaleParams:
+        """ScaleParams of every row seen, with the population std like `np.std`."""
+        if not self.count:
+            raise ValueError("No rows to fit ScaleParams on")
+        return ScaleParams(self.mean.copy(), np.sqrt(self.m2 / self.count), eps)
+
+    @classmethod
+    def fit(cls, chunks: Iterable[np.ndarray], eps: float = 1e-8) -> ScaleParams:
+        """ScaleParams of the rows of every chunk."""
+        fitter = cls()
+        for chunk in chunks:
+            fitter.update(chunk)
+        return fitter.finalize(eps)
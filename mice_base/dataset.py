@@ -0,0 +1,321 @@
+"""
+  Memory-mapped feature datasets for training
+
+  A dataset is a directory with one raw binary file per feature column and a
+  `meta.json` of the column names, row count and dtype. Columns are
+  memory-mapped on first use, so reading a range of rows or a few columns
+  only touches those bytes, and datasets far larger than memory can be
+  streamed. `FeatureDataset.batches` shuffles at the level of blocks of
+  contiguous rows, so reads stay sequential, and a background thread reads
+  and scales the next batches while the current one is used.
+"""
+import json
+import os
+import queue
+import threading
+from typing import Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# MICE
+from .ScaleParams import BatchScaler, ScaleParams
+
+_META = "meta.json"
+Columns = Optional[Sequence[Union[int, str]]]
+
+
+def _column_file(root: str, column: int) -> str:
+    return os.path.join(root, f"{column:05d}.bin")
+
+
+class DatasetWriter:
+    """Builds a dataset by appending chunks of rows.
+
+    Usage:
+        ```
+        with DatasetWriter("data/train", names) as writer:
+            for chunk in chunks:  # (n_rows, len(names)) arrays
+                writer.append(chunk)
+        dataset = FeatureDataset("data/train")
+        ```
+
+    Args:
+        root (str): The dataset directory, created if missing. An existing
+            dataset in it is overwritten.
+        names (Sequence[str]): The column names.
+        dtype: dtype the values are stored as.
+    """
+
+    def __init__(self, root: str, names: Sequence[str], dtype=np.float32):
+        self.root = root
+        self.names = list(names)
+        self.dtype = np.dtype(dtype)
+        self.n_rows = 0
+        os.makedirs(root, exist_ok=True)
+        self._remove_existing()
+        self._files = [open(_column_file(root, j), "wb") for j in range(len(self.names))]
+
+    def _remove_existing(self) -> None:
+        """Remove the dataset in `root`, if any: its meta.json first, so it is
+        never opened half removed, then every column file it lists."""
+        meta = os.path.join(self.root, _META)
+        try:
+            with open(meta, "r", encoding="utf-8") as f:
+                n_columns = len(json.load(f)["names"])
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError):  # unreadable, its columns are unknown
+            n_columns = 0
+        os.unlink(meta)
+        for j in range(n_columns):
+            try:
+                os.unlink(_column_file(self.root, j))
+            except FileNotFoundError:
+                pass
+
+    def append(self, rows: np.ndarray) -> None:
+        """Add an `(n_rows, n_columns)` array of rows."""
+        rows = np.asarray(rows)
+        if rows.ndim != 2 or rows.shape[1] != len(self.names):
+            raise ValueError(f"Expected rows of {len(self.names)} columns, got shape {rows.shape}")
+        for f, column in zip(self._files, rows.T):
+            f.write(np.ascontiguousarray(column, dtype=self.dtype).tobytes())
+        self.n_rows += len(rows)
+
+    def abort(self) -> None:
+        """Drop the rows appended so far, leaving no dataset behind."""
+        for f in self._files:
+            f.close()
+        self._files = []
+        for j in range(len(self.names)):
+            try:
+                os.unlink(_column_file(self.root, j))
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """Finish the dataset. Until then, it cannot be opened."""
+        for f in self._files:
+            f.close()
+        self._files = []
+        meta = {"names": self.names, "n_rows": self.n_rows, "dtype": self.dtype.str}
+        tmp = os.path.join(self.root, _META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.root, _META))
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FeatureDataset:
+    """Feature matrix stored column by column in a directory, read lazily.
+
+    Usage:
+        ```
+        dataset = FeatureDataset("data/train")
+        params = ScaleFitter.fit(dataset.chunks(65536))
+        for epoch in range(epochs):
+            for batch in dataset.batches(256, scale=params, seed=epoch):
+                ...
+        ```
+
+    Args:
+        root (str): Directory written by DatasetWriter or `FeatureDataset.write`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, _META), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.names: List[str] = meta["names"]
+        self.n_rows: int = meta["n_rows"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._index = {name: j for j, name in enumerate(self.names)}
+        self._columns: List[Optional[np.ndarray]] = [None] * len(self.names)
+
+    @classmethod
+    def write(
+        cls, root: str, matrix: np.ndarray, names: Sequence[str], dtype=np.float32
+    ) -> "FeatureDataset":
+        """Store a matrix, e.g. from `extract_matrix`, as a dataset."""
+        with DatasetWriter(root, names, dtype) as writer:
+            writer.append(matrix)
+        return cls(root)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def shape(self):
+        return (self.n_rows, len(self.names))
+
+    def column_indices(self, columns: Columns = None) -> np.ndarray:
+        """Indices of columns given by name or index, all columns if None.
+
+        Raises:
+            KeyError: If a name is not a column.
+        """
+        if columns is None:
+            return np.arange(len(self.names))
+        return np.array(
+            [self._index[c] if isinstance(c, str) else int(c) for c in columns], dtype=np.int64
+        )
+
+    def column(self, j: int) -> np.ndarray:
+        """Column `j`, memory-mapped read-only."""
+        mapped = self._columns[j]
+        if mapped is None:
+            if self.n_rows == 0:
+                mapped = np.zeros(0, dtype=self.dtype)
+            else:
+                mapped = np.memmap(_column_file(self.root, j), self.dtype, "r", shape=(self.n_rows,))
+            self._columns[j] = mapped
+        return mapped
+
+    def read(
+        self,
+        rows=slice(None),
+        columns: Columns = None,
+        scale: Optional[Union[ScaleParams, BatchScaler]] = None,
+        dtype=None,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Read some rows and columns into memory.
+
+        Args:
+            rows: A slice, or an array of row indices, ideally sorted.
+            columns (Columns): Names or indices of the columns, all if None.
+            scale (Optional[Union[ScaleParams, BatchScaler]]): Parameters fitted
+                on all columns of the dataset, to scale the values with.
+            dtype: dtype of the result, the dataset's if None.
+            out (Optional[np.ndarray]): A `(n_rows, n_columns)` array to read
+                into instead of allocating one.
+
+        Returns:
+            np.ndarray: An `(n_rows, n_columns)` array.
+        """
+        idx = self.column_indices(columns)
+        n = len(range(self.n_rows)[rows]) if isinstance(rows, slice) else len(rows)
+        if out is None:
+            out = np.empty((n, len(idx)), dtype=self.dtype if dtype is None else dtype)
+        for k, j in enumerate(idx.tolist()):
+            out[:, k] = self.column(j)[rows]
+        if scale is not None:
+            if isinstance(scale, ScaleParams):
+                scale = scale.batch(out.dtype)
+            scale.scale(out, idx=None if columns is None else idx, out=out)
+        return out
+
+    def chunks(self, chunk_rows: int = 65536, columns: Columns = None) -> Iterator[np.ndarray]:
+        """Consecutive row ranges, e.g. to fit ScaleParams with ScaleFitter.fit."""
+        for start in range(0, self.n_rows, chunk_rows):
+            yield self.read(slice(start, min(start + chunk_rows, self.n_rows)), columns)
+
+    def batches(
+        self,
+        batch_size: int,
+        columns: Columns = None,
+        shuffle: bool = True,
+        seed: Optional[int] = None,
+        scale: Optional[ScaleParams] = None,
+        dtype=np.float32,
+        drop_last: bool = False,
+        block_batches: int = 16,
+        readahead: int = 2,
+    ) -> Iterator[np.ndarray]:
+        """Minibatches of rows, read and scaled ahead in a background thread.
+
+        Rows are split into blocks of `batch_size` contiguous rows. When
+        shuffling, blocks are visited in random order and `block_batches` of
+        them at a time are read, their rows shuffled together and cut into
+        batches: every row is yielded once per pass, and all reads are
+        sequential runs of `batch_size` rows. Rows left over after cutting a
+        group into batches are carried into the next group, so every batch
+        but the last has `batch_size` rows.
+
+        Args:
+            batch_size (int): Rows per batch.
+            columns (Columns): Names or indices of the columns, all if None.
+            shuffle (bool): Shuffle the rows, otherwise yield them in order.
+            seed (Optional[int]): Seed of the shuffle, e.g. the epoch.
+            scale (Optional[ScaleParams]): Parameters fitted on all columns of
+                the dataset, applied to every batch.
+            dtype: dtype of the batches.
+            drop_last (bool): Skip the last batch if it has fewer rows, so
+                every batch has `batch_size` rows.
+            block_batches (int): Number of blocks shuffled together.
+            readahead (int): Number of groups of blocks read ahead.
+
+        Yields:
+            np.ndarray: `(batch_size, n_columns)` arrays, which the caller owns.
+        """
+        idx = self.column_indices(columns)
+        subset = None if columns is None else idx
+        scaler = None if scale is None else scale.batch(dtype)
+        rng = np.random.default_rng(seed)
+        blocks = np.arange(0, self.n_rows, batch_size)
+        if shuffle:
+            rng.shuffle(blocks)
+        groups = [blocks[k : k + block_batches] for k in range(0, len(blocks), block_batches)]
+
+        def produce(group: np.ndarray) -> np.ndarray:
+            starts = group.tolist()
+            stops = [min(start + batch_size, self.n_rows) for start in starts]
+            rows = np.empty((sum(b - a for a, b in zip(starts, stops)), len(idx)), dtype=dtype)
+            offset = 0
+            for start, stop in zip(starts, stops):
+                self.read(slice(start, stop), idx, out=rows[offset : offset + stop - start])
+                offset += stop - start
+            if shuffle:
+                rows = rows[rng.permutation(len(rows))]
+            if scaler is not None:
+                scaler.scale(rows, idx=subset, out=rows)
+            return rows
+
+        ready: "queue.Queue" = queue.Queue(maxsize=max(readahead, 1))
+        stop = threading.Event()
+        done = object()
+
+        def reader() -> None:
+            try:
+                carry = np.empty((0, len(idx)), dtype=dtype)
+                for group in groups:
+                    if stop.is_set():
+                        return
+                    rows = produce(group)
+                    if len(carry):
+                        rows = np.concatenate([carry, rows])
+                    full = len(rows) - len(rows) % batch_size
+                    ready.put([rows[k : k + batch_size] for k in range(0, full, batch_size)])
+                    carry = rows[full:]
+                if len(carry) and not drop_last:
+                    ready.put([carry])
+                ready.put(done)
+            except BaseException as e:  # re-raised in the consumer
+                ready.put(e)
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            stop.set()
+            while thread.is_alive():  # unblock a reader waiting on a full queue
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
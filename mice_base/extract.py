@@ -0,0 +1,82 @@
+"""
+  Batch extraction of feature matrices
+
+  `extract_matrix` evaluates a FeaturePlan over batches of windows and writes
+  each feature's columns straight into one preallocated
+  `(n_windows, n_columns)` array, instead of assembling per-window Python
+  lists.
+"""
+import itertools as it
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# MICE
+from .fe_types import Window
+from .planner import FeaturePlan, FeatureType
+
+
+def column_slices(plan: FeaturePlan, win_size: int) -> List[slice]:
+    """The columns of each requested feature of `plan` in its output."""
+    slices = []
+    start = 0
+    for feature in plan.features:
+        width = len(feature.get_names(win_size))
+        slices.append(slice(start, start + width))
+        start += width
+    return slices
+
+
+def extract_matrix(
+    features: Sequence[FeatureType],
+    windows: Iterable[Window],
+    win_size: int,
+    out: Optional[np.ndarray] = None,
+    dtype=np.float64,
+    batch_size: int = 1024,
+) -> Tuple[np.ndarray, List[str]]:
+    """Compute `features` for every window into a single matrix.
+
+    Args:
+        features (Sequence[FeatureType]): The features, in column order, or a
+            FeaturePlan of them.
+        windows (Iterable[Window]): The windows, one row each. Iterables
+            without a length are materialized first unless `out` is given.
+        win_size (int): Number of packets per window.
+        out (Optional[np.ndarray]): A `(n_windows, n_columns)` array to write
+            into instead of allocating one.
+        dtype: dtype of the allocated output.
+        batch_size (int): Number of windows evaluated together, see
+            `FeaturePlan.evaluate_batch`.
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: The matrix and its column names, i.e.
+            the concatenated `get_names(win_size)` of `features`.
+    """
+    plan = features if isinstance(features, FeaturePlan) else FeaturePlan(features)
+    names = plan.get_names(win_size)
+    slices = column_slices(plan, win_size)
+
+    if out is None:
+        if not hasattr(windows, "__len__"):
+            windows = list(windows)
+        out = np.zeros((len(windows), len(names)), dtype=dtype)
+    elif out.shape[1] != len(names):
+        raise ValueError(f"out has {out.shape[1]} columns, the features need {len(names)}")
+
+    rows = 0
+    windows = iter(windows)
+    while True:
+        batch = list(it.islice(windows, batch_size))
+        if not batch:
+            break
+        if rows + len(batch) > len(out):
+            raise ValueError(f"out has {len(out)} rows but there are more windows")
+        values = plan.evaluate_batch(batch, win_size)
+        for feature, columns in zip(plan.features, slices):
+            out[rows : rows + len(batch), columns] = values[feature]
+        rows += len(batch)
+
+    if rows != len(out):
+        raise ValueError(f"out has {len(out)} rows but there were {rows} windows")
+    return out, names
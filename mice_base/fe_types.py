@@ -13,6 +13,7 @@ from typing import (
 )
 from dataclasses import dataclass
 
+import numpy as np
 import scapy
 import scapy.layers
 import scapy.layers.l2
@@ -63,6 +64,18 @@ class FlowID(NamedTuple):
 Pkt = Type[scapy.layers.l2.Ether]
 
 
+class RawPkt(NamedTuple):
+    """A captured frame kept as raw bytes instead of a dissected scapy packet.
+
+    Base features read the header fields they need from `data` directly
+    (see BaseFeatures.raw_headers), which is much cheaper than dissection.
+    """
+
+    time: float
+    data: bytes
+    linktype: int = 1  # pcap LINKTYPE_ETHERNET
+
+
 class Pkts(NamedTuple):
     name: str
     data: List[Any]
@@ -80,6 +93,46 @@ class Pkts(NamedTuple):
     #     return self.data.__contains__(item)
 
 
+class PacketTable(NamedTuple):
+    """Struct-of-arrays view of a window (or whole flow) of packets.
+
+    Every column is decoded once per packet by `build_packet_table`, so
+    windowized features can slice arrays instead of re-dissecting packets.
+    """
+
+    name: str
+    time: np.ndarray  # float64 capture timestamps
+    direction: np.ndarray  # int8, as returned by Direction.get_value
+    size: np.ndarray  # int64, as returned by Size.get_value (None stored as 0)
+    entropy: np.ndarray  # float64, as returned by Entropy.get_value
+    proto: np.ndarray  # uint8, a Proto value per packet
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, PacketTable) or self.name != other.name:
+            return False
+        return all(
+            np.array_equal(a, b) for a, b in zip(self[1:], other[1:])
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __len__(self):
+        return len(self.time)
+
+    def slice(self, start: int, end: int) -> "PacketTable":
+        """Zero-copy view of packets `start:end`, e.g. one window of a flow."""
+        return PacketTable(
+            f"{self.name}[{start}:{end}]",
+            *(col[start:end] for col in self[1:]),
+        )
+
+
 """A flow as defined by a flow ID and a list of packets within the flow"""
 # TODO: update to named tuple?
 Flow = Tuple[
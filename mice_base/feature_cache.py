@@ -0,0 +1,318 @@
+"""
+  Persistent, content-addressed cache of extracted feature matrices
+
+  Matrices are stored as `.npy` files named by a key combining the digest of
+  the capture file, the feature columns (`get_names(win_size)`), the window
+  parameters and FEATURE_VERSION, so a changed capture, feature set or
+  feature implementation never reuses a stale matrix. Captures are hashed
+  on every lookup unless `trust_mtime` is given. Matrices are extracted in
+  chunks of windows straight into the file, which is renamed into place
+  once complete, read back memory-mapped, and the least recently used ones
+  are evicted once the cache grows past its size bound.
+"""
+import hashlib
+import itertools as it
+import json
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# MICE
+from .fe_types import Pkts, Window
+from .extract import extract_matrix
+from .pcap_stream import stream_windows
+from .BaseFeatures.packet_table import build_packet_table
+from .planner import FeaturePlan, FeatureType
+
+# Bump whenever a change to feature code changes the values it computes.
+FEATURE_VERSION = 1
+
+_DIGESTS = "digests.json"
+_NPY_HEADER_SIZE = 128  # room for any 2-d shape, a multiple of 64 as .npy requires
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int  # matrices removed to stay within max_bytes
+    entries: int  # matrices currently cached
+    bytes: int  # total size of the cached matrices
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of the contents of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(
+    digest: str,
+    features: Sequence[FeatureType],
+    win_size: int,
+    stride: Optional[int] = None,
+    version: int = FEATURE_VERSION,
+    **params: Any,
+) -> str:
+    """Key of the matrix of `features` over the capture with contents `digest`.
+
+    Args:
+        digest (str): Digest of the capture file, see `file_digest`.
+        features (Sequence[FeatureType]): The features, in column order, or a
+            FeaturePlan of them.
+        win_size (int): Number of packets per window.
+        stride (Optional[int]): Packets between window starts.
+        version (int): Version stamp of the feature code.
+        **params: Any other parameter that changes the windows, e.g. the flow
+            timeouts of `stream_windows`. Values must have a stable `repr`.
+
+    Returns:
+        str: A hex digest.
+    """
+    plan = features if isinstance(features, FeaturePlan) else FeaturePlan(features)
+    description = {
+        "input": digest,
+        "columns": plan.get_names(win_size),
+        "win_size": win_size,
+        "stride": stride,
+        "version": version,
+        "params": {name: repr(value) for name, value in sorted(params.items())},
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _npy_header(dtype: np.dtype, shape: Tuple[int, int]) -> bytes:
+    """A version 1.0 `.npy` header padded to _NPY_HEADER_SIZE bytes, so it
+    can be rewritten in place once the number of rows is known."""
+    header = repr(
+        {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    )
+    prefix = np.lib.format.magic(1, 0)
+    length = _NPY_HEADER_SIZE - len(prefix) - 2
+    return prefix + struct.pack("<H", length) + (header.ljust(length - 1) + "\n").encode("latin1")
+
+
+def _atomic_write(path: str, write) -> None:
+    """Call `write(f)` on a temporary file next to `path`, then rename it to
+    `path`, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _decode_windows(windows: List[Window]) -> List[Window]:
+    """`windows` over slices of PacketTables, so every packet is decoded once
+    rather than once per feature.
+
+    Each flow gets one table of its packets in `windows`. Overlapping windows
+    of a flow share the packets they have in common, by identity, and slice
+    the same rows of the table.
+    """
+    flows: Dict[Any, Tuple[List, Dict[int, int]]] = {}
+    spans = []
+    for window in windows:
+        pkts, rows = flows.setdefault(window.fid, ([], {}))
+        data = window.data.data
+        start = rows.get(id(data[0]), len(pkts)) if data else len(pkts)
+        shared = pkts[start : start + len(data)]
+        if any(a is not b for a, b in zip(shared, data)):
+            start, shared = len(pkts), []
+        for pkt in data[len(shared) :]:
+            rows[id(pkt)] = len(pkts)
+            pkts.append(pkt)
+        spans.append((start, start + len(data)))
+
+    tables = {
+        fid: build_packet_table(fid, Pkts(f"{windows[0].id}:{k}", pkts))
+        for k, (fid, (pkts, _)) in enumerate(flows.items())
+    }
+    return [
+        window._replace(data=tables[window.fid].slice(start, end))
+        for window, (start, end) in zip(windows, spans)
+    ]
+
+
+class FeatureCache:
+    """Directory of feature matrices keyed by `cache_key`.
+
+    Usage:
+        ```
+        cache = FeatureCache("~/.cache/mice", max_bytes=50 << 30)
+        matrix, names = cache.extract("capture.pcap", features, win_size=100)
+        print(cache.stats)
+        ```
+
+    Args:
+        root (str): The cache directory, created if missing.
+        max_bytes (Optional[int]): Total size of the matrices above which the
+            least recently used are evicted. Unbounded if None.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        self.root = os.path.expanduser(root)
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".npy")
+
+    def _entries(self) -> List[os.DirEntry]:
+        return [
+            entry
+            for entry in os.scandir(self.root)
+            if entry.name.endswith(".npy") and not entry.name.startswith(".")
+        ]
+
+    @property
+    def stats(self) -> CacheStats:
+        sizes = [entry.stat().st_size for entry in self._entries()]
+        return CacheStats(self.hits, self.misses, self.evictions, len(sizes), sum(sizes))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """The cached matrix of `key`, memory-mapped read-only, or None."""
+        path = self._path(key)
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:  # never stored, or evicted by another process
+            self.misses += 1
+            return None
+        self.hits += 1
+        return matrix
+
+    def put(self, key: str, matrix: np.ndarray) -> None:
+        """Store a matrix under `key`, then evict down to `max_bytes`."""
+        _atomic_write(self._path(key), lambda f: np.save(f, matrix))
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove the least recently used matrices until the cache fits in
+        `max_bytes`, never removing the one of `keep`."""
+        if self.max_bytes is None:
+            return
+        entries = [(entry.stat(), entry) for entry in self._entries()]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, entry in sorted(entries, key=lambda pair: pair[0].st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            if entry.name == f"{keep}.npy":
+                continue
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:  # evicted by another process
+                pass
+            total -= stat.st_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            os.unlink(entry.path)
+
+    def digest(self, path: str, trust_mtime: bool = False) -> str:
+        """`file_digest` of a capture.
+
+        Args:
+            path (str): Path to the capture.
+            trust_mtime (bool): Reuse the digest computed by an earlier run if
+                the file's size and modification time are unchanged, instead of
+                hashing it again. A file rewritten with the same size and a
+                preserved modification time then gets a stale digest.
+        """
+        index_path = os.path.join(self.root, _DIGESTS)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index: Dict[str, List] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = {}
+
+        real = os.path.realpath(path)
+        stat = os.stat(real)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        known = index.get(real)
+        if trust_mtime and known is not None and known[:2] == signature:
+            return known[2]
+
+        digest = file_digest(real)
+        index[real] = signature + [digest]
+        _atomic_write(index_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+        return digest
+
+    def extract(
+        self,
+        path: str,
+        features: Sequence[FeatureType],
+        win_size: int,
+        stride: Optional[int] = None,
+        dtype=np.float64,
+        trust_mtime: bool = False,
+        chunk_windows: int = 4096,
+        **kwargs: Any,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """`extract_matrix` of the windows `stream_windows` reads from a
+        capture, from the cache if it was extracted before.
+
+        On a miss, windows are extracted `chunk_windows` at a time and their
+        rows appended to the cache file, so only one chunk of windows is held
+        in memory. The packets of a chunk are decoded once into PacketTables
+        that all features read.
+
+        Args:
+            path (str): Path to the pcap or pcapng file.
+            features (Sequence[FeatureType]): The features, in column order,
+                or a FeaturePlan of them.
+            win_size (int): Number of packets per window.
+            stride (Optional[int]): Packets between window starts.
+            dtype: dtype of the matrix.
+            trust_mtime (bool): See `digest`.
+            chunk_windows (int): Number of windows extracted at a time.
+            **kwargs: Passed on to `stream_windows`.
+
+        Returns:
+            Tuple[np.ndarray, List[str]]: The matrix, memory-mapped read-only,
+                and its column names.
+        """
+        plan = features if isinstance(features, FeaturePlan) else FeaturePlan(features)
+        names = plan.get_names(win_size)
+        key = cache_key(
+            self.digest(path, trust_mtime),
+            plan,
+            win_size,
+            stride,
+            dtype=np.dtype(dtype).str,
+            **kwargs,
+        )
+        matrix = self.get(key)
+        if matrix is None:
+            windows = stream_windows(path, win_size, stride, **kwargs)
+            shape = (0, len(names))
+
+            def write(f) -> None:
+                nonlocal shape
+                f.write(_npy_header(np.dtype(dtype), shape))
+                while True:
+                    chunk = list(it.islice(windows, chunk_windows))
+                    if not chunk:
+                        break
+                    rows, _ = extract_matrix(plan, _decode_windows(chunk), win_size, dtype=dtype)
+                    f.write(rows.tobytes())
+                    shape = (shape[0] + len(rows), shape[1])
+                f.seek(0)
+                f.write(_npy_header(np.dtype(dtype), shape))
+
+            _atomic_write(self._path(key), write)
+            self.evict(keep=key)
+            matrix = np.load(self._path(key), mmap_mode="r")
+        return matrix, names
@@ -0,0 +1,262 @@
+"""
+  Incremental assembly of packet streams into bidirectional flows
+
+  Both directions of a conversation share one canonical key, so A->B and B->A
+  packets land in the same flow. Flows are evicted on idle timeout, TCP RST,
+  the end of a FIN/FIN/ACK teardown or when the table is full, and split into consecutive segments on
+  active timeout or once they buffer `max_pkts` packets, which keeps memory
+  bounded by the number of live flows.
+"""
+from collections import Counter, OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# scapy
+import scapy.layers.inet
+
+# MICE
+from .fe_types import Flow, FlowID, Proto, RawPkt
+from .BaseFeatures.raw_headers import parse_frame
+
+TCP_FIN = 0x01
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+FlowKey = Tuple
+
+
+def packet_flow(pkt) -> Tuple[Optional[FlowID], int]:
+    """The FlowID of a packet, oriented from its sender, and its TCP flags.
+
+    Args:
+        pkt: A RawPkt or a scapy packet.
+
+    Returns:
+        Tuple[Optional[FlowID], int]: The FlowID is None for packets without an
+            IPv4 header, which `Direction.get_value` cannot orient either.
+    """
+    if isinstance(pkt, RawPkt):
+        headers = parse_frame(pkt.data, pkt.linktype)
+        if headers.ip_src is None:
+            return None, 0
+        fid = FlowID(
+            headers.ip_src, headers.ip_dst, headers.sport, headers.dport, headers.proto
+        )
+        return fid, headers.tcp_flags
+
+    ip = pkt.getlayer(scapy.layers.inet.IP)
+    if ip is None:
+        return None, 0
+    # Same precedence as Direction.get_value: UDP first, then TCP.
+    udp = pkt.getlayer(scapy.layers.inet.UDP)
+    if udp is not None:
+        return FlowID(ip.src, ip.dst, udp.sport, udp.dport, Proto.UDP), 0
+    tcp = pkt.getlayer(scapy.layers.inet.TCP)
+    if tcp is not None:
+        return FlowID(ip.src, ip.dst, tcp.sport, tcp.dport, Proto.TCP), int(tcp.flags)
+    return FlowID(ip.src, ip.dst, 0, 0, Proto.OTHER), 0
+
+
+def flow_id(pkt) -> Optional[FlowID]:
+    """The FlowID of a packet, oriented from its sender to its receiver."""
+    return packet_flow(pkt)[0]
+
+
+def canonical_key(fid: FlowID) -> FlowKey:
+    """A key shared by both directions of a flow."""
+    a = (fid.sip, fid.sport)
+    b = (fid.dip, fid.dport)
+    return (a, b, int(fid.proto)) if a <= b else (b, a, int(fid.proto))
+
+
+def flow_name(fid: FlowID) -> str:
+    return f"{fid.sip}:{fid.sport}-{fid.dip}:{fid.dport}-{int(fid.proto)}"
+
+
+class FlowEntry:
+    """The live state of one flow: its orientation and buffered packets.
+
+    `fid` is oriented like the first packet of the flow, so that packet (the
+    initiator's) has direction +1.
+    """
+
+    def __init__(self, fid: FlowID, time: float):
+        self.fid = fid
+        self.first_seen = time  # start of the current segment
+        self.last_seen = time
+        self.pkts: List = []
+        self.start = 0  # index within the flow of self.pkts[0]
+        self.seen = 0  # packets of the flow seen so far
+        self.fins = set()  # directions (+1 or -1) that have sent a FIN
+        self.closed_at: Optional[float] = None  # time of the second FIN
+
+    def add(self, pkt) -> None:
+        self.pkts.append(pkt)
+        self.seen += 1
+
+    def take(self) -> List:
+        """Hand over the buffered packets, the flow continues after them."""
+        pkts = self.pkts
+        self.pkts = []
+        self.start = self.seen
+        return pkts
+
+
+class Eviction(NamedTuple):
+    entry: FlowEntry
+    pkts: List
+    start: int  # index within the flow of pkts[0]
+    reason: str  # "idle", "active", "fin", "rst", "max_pkts", "capacity" or "flush"
+
+
+def _is_forward(entry: FlowEntry, fid: FlowID) -> bool:
+    return (fid.sip, fid.sport) == (entry.fid.sip, entry.fid.sport)
+
+
+class FlowTable:
+    """Hash table of live flows keyed on canonical bidirectional FlowIDs.
+
+    A TCP RST evicts its flow at once. A FIN only closes its direction: the
+    flow is evicted by the first ACK without FIN after both directions sent
+    a FIN, i.e. the last ACK of the teardown, or `fin_linger` seconds after
+    the second FIN if that ACK never comes.
+
+    Args:
+        idle_timeout (Optional[float]): Seconds without packets after which a
+            flow is evicted. None disables it.
+        active_timeout (Optional[float]): Seconds after which a flow's packets
+            are emitted as a segment even though the flow is still active.
+        max_pkts (Optional[int]): Emit a segment once a flow buffers this many
+            packets, e.g. the window size.
+        max_flows (Optional[int]): Evict the least recently active flow once
+            more than this many flows are live.
+        entry_factory (Callable[[FlowID, float], FlowEntry]): Creates the entry
+            of a new flow, to let callers keep extra per-flow state.
+        fin_linger (float): Seconds a flow whose directions both sent a FIN
+            waits for the last ACK.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: Optional[float] = 120.0,
+        active_timeout: Optional[float] = None,
+        max_pkts: Optional[int] = None,
+        max_flows: Optional[int] = None,
+        entry_factory: Callable[[FlowID, float], FlowEntry] = FlowEntry,
+        fin_linger: float = 1.0,
+    ):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_pkts = max_pkts
+        self.max_flows = max_flows
+        self.entry_factory = entry_factory
+        self.fin_linger = fin_linger
+        # Least recently active flow first.
+        self._flows: "OrderedDict[FlowKey, FlowEntry]" = OrderedDict()
+        # Flows whose directions both sent a FIN, in order of their second FIN.
+        self._closing: "OrderedDict[FlowKey, FlowEntry]" = OrderedDict()
+        self.evictions: Counter = Counter()
+        self.packets = 0
+
+    @property
+    def live_flows(self) -> int:
+        return len(self._flows)
+
+    def add(self, pkt) -> Tuple[Optional[FlowEntry], List[Eviction]]:
+        """Add one packet to its flow.
+
+        Returns:
+            Tuple[Optional[FlowEntry], List[Eviction]]: The entry the packet was
+                added to (None if it has no IPv4 header) and every segment that
+                ended, in eviction order.
+        """
+        fid, flags = packet_flow(pkt)
+        if fid is None:
+            return None, []
+
+        time = float(pkt.time)
+        evicted = self.expire(time)
+        self.packets += 1
+
+        key = canonical_key(fid)
+        entry = self._flows.get(key)
+        if entry is None:
+            entry = self._flows[key] = self.entry_factory(fid, time)
+            if self.max_flows is not None and len(self._flows) > self.max_flows:
+                oldest_key, oldest = self._flows.popitem(last=False)
+                self._closing.pop(oldest_key, None)
+                evicted.append(self._evict(oldest, "capacity"))
+        else:
+            self._flows.move_to_end(key)
+            if (
+                self.active_timeout is not None
+                and time - entry.first_seen >= self.active_timeout
+            ):
+                evicted.append(self._evict(entry, "active"))
+                entry.first_seen = time
+
+        entry.last_seen = time
+        entry.add(pkt)
+
+        if flags & TCP_FIN:
+            entry.fins.add(1 if _is_forward(entry, fid) else -1)
+            if len(entry.fins) == 2 and entry.closed_at is None:
+                entry.closed_at = time
+                self._closing[key] = entry
+        if flags & TCP_RST:
+            self._remove(key)
+            evicted.append(self._evict(entry, "rst"))
+        elif entry.closed_at is not None and flags & TCP_ACK and not flags & TCP_FIN:
+            self._remove(key)
+            evicted.append(self._evict(entry, "fin"))
+        elif self.max_pkts is not None and len(entry.pkts) >= self.max_pkts:
+            evicted.append(self._evict(entry, "max_pkts"))
+
+        return entry, evicted
+
+    def _remove(self, key: FlowKey) -> None:
+        del self._flows[key]
+        self._closing.pop(key, None)
+
+    def expire(self, now: float) -> List[Eviction]:
+        """Evict every flow idle for longer than `idle_timeout`, or closed by
+        both FINs more than `fin_linger` ago, at time `now`."""
+        evicted = []
+        while self._closing:
+            key, entry = next(iter(self._closing.items()))
+            if now - entry.closed_at <= self.fin_linger:
+                break
+            self._remove(key)
+            evicted.append(self._evict(entry, "fin"))
+        if self.idle_timeout is None:
+            return evicted
+        while self._flows:
+            key, entry = next(iter(self._flows.items()))
+            if now - entry.last_seen <= self.idle_timeout:
+                break
+            self._remove(key)
+            evicted.append(self._evict(entry, "idle"))
+        return evicted
+
+    def flush(self) -> List[Eviction]:
+        """Evict every live flow, e.g. at the end of a capture."""
+        evicted = [self._evict(entry, "flush") for entry in self._flows.values()]
+        self._flows.clear()
+        self._closing.clear()
+        return evicted
+
+    def push(self, pkt) -> List[Flow]:
+        """Add one packet and return the flows (or flow segments) that ended."""
+        return self._as_flows(self.add(pkt)[1])
+
+    def drain(self) -> List[Flow]:
+        """Evict every live flow and return them."""
+        return self._as_flows(self.flush())
+
+    def _evict(self, entry: FlowEntry, reason: str) -> Eviction:
+        self.evictions[reason] += 1
+        start = entry.start
+        return Eviction(entry, entry.take(), start, reason)
+
+    @staticmethod
+    def _as_flows(evicted: List[Eviction]) -> List[Flow]:
+        return [(eviction.entry.fid, eviction.pkts) for eviction in evicted if eviction.pkts]
@@ -0,0 +1,103 @@
+"""
+  Window-scoped memoization of feature values
+
+  Feature `get_value`s decorated with `memoized` share one WindowMemo while it
+  is active, so a derived feature reuses the Directions/Sizes/... another
+  feature already computed for the same window. Entries are keyed on the
+  identity of the window's packets (never on `Pkts.name`), bounded by a
+  number of windows, and dropped when the memo is cleared or exited. Outside
+  of an active memo nothing is cached and no packets are kept alive.
+"""
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+_active: ContextVar[Optional["WindowMemo"]] = ContextVar("window_memo", default=None)
+
+
+class MemoStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int  # windows dropped to stay within max_windows
+    windows: int  # windows currently memoized
+
+
+class WindowMemo:
+    """LRU memo of feature values for the most recently used windows.
+
+    Usage:
+        ```
+        with WindowMemo(max_windows=4096) as memo:
+            for window in windows:
+                values = plan.get_value(window.fid, window.data, win_size)
+        print(memo.stats)
+        ```
+
+    Args:
+        max_windows (int): Number of windows whose values are kept.
+    """
+
+    def __init__(self, max_windows: int = 4096):
+        self.max_windows = max_windows
+        # id(pkts) -> (pkts, {(get_value, fid, win_size): values}), least recent first
+        self._windows: "OrderedDict[int, Tuple[Any, Dict]]" = OrderedDict()
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self) -> MemoStats:
+        return MemoStats(self.hits, self.misses, self.evictions, len(self._windows))
+
+    def clear(self) -> None:
+        """Drop every memoized window, e.g. after a batch."""
+        self._windows.clear()
+
+    def lookup(self, get_value: Callable, fid, pkts, win_size: int):
+        """`get_value(fid, pkts, win_size)`, memoized for the window `pkts`."""
+        entry = self._windows.get(id(pkts))
+        if entry is None:
+            entry = (pkts, {})
+            self._windows[id(pkts)] = entry
+            if len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._windows.move_to_end(id(pkts))
+
+        key = (get_value, fid, win_size)
+        values = entry[1].get(key)
+        if values is None:
+            self.misses += 1
+            values = entry[1][key] = get_value(fid, pkts, win_size)
+        else:
+            self.hits += 1
+        return values
+
+    def __enter__(self) -> "WindowMemo":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _active.reset(self._token)
+        self._token = None
+        self.clear()
+
+
+def active_memo() -> Optional[WindowMemo]:
+    return _active.get()
+
+
+def memoized(get_value: Callable) -> Callable:
+    """Memoize a feature's `get_value(fid, pkts, win_size)` in the active WindowMemo."""
+
+    @wraps(get_value)
+    def wrapper(fid, pkts, win_size: int):
+        memo = _active.get()
+        if memo is None:
+            return get_value(fid, pkts, win_size)
+        return memo.lookup(get_value, fid, pkts, win_size)
+
+    return wrapper
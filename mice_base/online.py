@@ -0,0 +1,195 @@
+"""
+  Online per-flow feature state for live classification
+
+  A FlowFeatureState is fed the packets of one flow as they arrive. Each
+  `push` updates the per-packet features and the running IAT, burst and byte
+  total state in constant time, and `snapshot` returns the features of the
+  window so far, equal to the batch `get_value` of the same packets.
+"""
+from typing import Dict, List, Optional, Sequence
+
+# MICE
+from .fe_types import FlowID, Pkt, RawPkt
+from .planner import FeaturePlan, FeatureType
+from .BaseFeatures.Directions import Direction, Directions
+from .BaseFeatures.Entropies import Entropy, Entropies
+from .BaseFeatures.Sizes import Size, Sizes
+from .BaseFeatures.Times import Times
+from .BaseFeatures.raw_headers import parse_frame
+from .DerivedFeatures.BurstDepths import BurstDepths
+from .DerivedFeatures.DirSignBurstBytes import DirSignBurstBytes
+from .DerivedFeatures.DirSignSizes import DirSignSizes
+from .DerivedFeatures.IATs import IATs
+from .DerivedFeatures.TotalBwdBytes import TotalBwdBytes
+from .DerivedFeatures.TotalFwdBytes import TotalFwdBytes
+
+# Features a FlowFeatureState keeps up to date as packets arrive. Features
+# derived from them, e.g. summaries or histograms, are derived on `snapshot`.
+ONLINE_FEATURES = (
+    Directions,
+    Sizes,
+    Entropies,
+    Times,
+    DirSignSizes,
+    IATs,
+    BurstDepths,
+    DirSignBurstBytes,
+    TotalFwdBytes,
+    TotalBwdBytes,
+)
+
+
+class FlowFeatureState:
+    """Features of the current window of a flow, updated packet by packet.
+
+    Windows are consecutive and do not overlap: pushing a packet into a full
+    window starts the next one.
+
+    Usage:
+        ```
+        state = FlowFeatureState(fid, win_size=100)
+        for pkt in live_packets:
+            state.push(pkt)
+            vector = state.snapshot()
+        ```
+
+    Args:
+        fid (FlowID): The flow, which orients the packet directions.
+        win_size (int): Number of packets per window.
+        features (Sequence[FeatureType]): The features of `snapshot`, in
+            column order. Every base feature they depend on must be one of
+            ONLINE_FEATURES.
+
+    Raises:
+        ValueError: If a feature depends on a base feature outside of
+            ONLINE_FEATURES.
+    """
+
+    def __init__(
+        self, fid: FlowID, win_size: int, features: Sequence[FeatureType] = ONLINE_FEATURES
+    ):
+        self.fid = fid
+        self.win_size = win_size
+        self.plan = FeaturePlan(features)
+        unsupported = [
+            feature.__name__
+            for feature in self.plan.order
+            if not feature.dependencies and feature not in ONLINE_FEATURES
+        ]
+        if unsupported:
+            raise ValueError(f"Features not computable online: {', '.join(unsupported)}")
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new, empty window."""
+        win_size = self.win_size
+        self.n = 0
+        self.directions: List[float] = [0.0] * win_size
+        self.sizes: List[float] = [0.0] * win_size
+        self.entropies: List[float] = [0.0] * win_size
+        self.times: List[float] = [Times.per_packet.fill] * win_size
+        self.iats: List[float] = [0.0] * win_size
+        self.burst_depths: List[float] = [0.0] * win_size
+        self.burst_bytes: List[float] = [0.0] * win_size
+        self.fwd_bytes = 0.0
+        self.bwd_bytes = 0.0
+
+        self._last_fwd: Optional[float] = None
+        self._last_bwd: Optional[float] = None
+        self._since_fwd = 0
+        self._since_bwd = 0
+        self._bursts = 0
+        self._run_direction = 0
+        self._run_bytes = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.n == self.win_size
+
+    def push(self, pkt: Pkt) -> None:
+        """Add the next packet of the flow to the window."""
+        if self.full:
+            self.reset()
+
+        if isinstance(pkt, RawPkt):
+            headers = parse_frame(pkt.data, pkt.linktype)
+            direction = Direction.from_headers(self.fid, headers)
+            size = Size.from_headers(self.fid, headers)
+            entropy = Entropy.from_headers(self.fid, headers)
+        else:
+            direction = Direction.get_value(self.fid, pkt)
+            size = Size.get_value(self.fid, pkt)
+            entropy = Entropy.get_value(self.fid, pkt)
+        time = float(pkt.time)
+
+        idx = self.n
+        self.n += 1
+        self.directions[idx] = direction
+        self.sizes[idx] = size
+        self.entropies[idx] = entropy
+        self.times[idx] = time
+
+        # IATs
+        if direction > 0:
+            if self._last_fwd is not None:
+                self.iats[idx] = time - self._last_fwd
+            self._last_fwd = time
+        else:
+            if self._last_bwd is not None:
+                self.iats[idx] = time - self._last_bwd
+            self._last_bwd = time
+
+        # BurstDepths
+        if direction > 0:
+            self.burst_depths[idx] = self._since_bwd
+            self._since_bwd -= 1
+            self._since_fwd = 0
+        elif direction < 0:
+            self.burst_depths[idx] = self._since_fwd
+            self._since_fwd += 1
+            self._since_bwd = 0
+
+        # DirSignBurstBytes: a run becomes a burst once the direction changes.
+        if direction == self._run_direction:
+            self._run_bytes += size
+        else:
+            if self._run_direction != 0:
+                self.burst_bytes[self._bursts] = self._run_direction * self._run_bytes
+                self._bursts += 1
+            self._run_direction = direction
+            self._run_bytes = size
+
+        # TotalFwdBytes, TotalBwdBytes
+        dir_sign_size = direction * size
+        if dir_sign_size > 0:
+            self.fwd_bytes += dir_sign_size
+        elif dir_sign_size < 0:
+            self.bwd_bytes -= dir_sign_size
+
+    def values(self) -> Dict[FeatureType, List[float]]:
+        """Values of the ONLINE_FEATURES for the window so far."""
+        burst_bytes = list(self.burst_bytes)
+        if self.n < self.win_size and self._run_direction != 0:
+            # The padding after the last packet ends the open run.
+            burst_bytes[self._bursts] = self._run_direction * self._run_bytes
+
+        return {
+            Directions: list(self.directions),
+            Sizes: list(self.sizes),
+            Entropies: list(self.entropies),
+            Times: list(self.times),
+            DirSignSizes: [d * s for d, s in zip(self.directions, self.sizes)],
+            IATs: list(self.iats),
+            BurstDepths: list(self.burst_depths),
+            DirSignBurstBytes: burst_bytes,
+            TotalFwdBytes: [self.fwd_bytes],
+            TotalBwdBytes: [self.bwd_bytes],
+        }
+
+    def get_names(self) -> List[str]:
+        return self.plan.get_names(self.win_size)
+
+    def snapshot(self) -> List[float]:
+        """The features of the window so far, in the columns of `get_names`."""
+        values = self.plan.evaluate(self.fid, None, self.win_size, known=self.values())
+        return [value for feature in self.plan.features for value in values[feature]]
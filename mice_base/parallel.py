@@ -0,0 +1,98 @@
+"""
+  Multiprocess feature extraction into a shared-memory matrix
+
+  Windows are sharded into chunks of rows. Forked workers inherit the feature
+  plan, the windows and an anonymous shared mapping of the matrix, and write
+  their rows into it directly, so only `(start, stop)` pairs travel between
+  processes. The matrix returned is that mapping, not a copy of it.
+"""
+import itertools as it
+import mmap
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# MICE
+from .fe_types import Window
+from .extract import extract_matrix
+from .planner import FeaturePlan, FeatureType
+
+# Jobs inherited by forked workers: id -> (plan, windows, matrix, win_size)
+_jobs: Dict[int, Tuple] = {}
+_job_ids = it.count()
+
+
+def _extract_rows(job_id: int, start: int, stop: int) -> int:
+    plan, windows, matrix, win_size = _jobs[job_id]
+    extract_matrix(plan, windows[start:stop], win_size, out=matrix[start:stop])
+    return stop - start
+
+
+def extract_matrix_parallel(
+    features: Sequence[FeatureType],
+    windows: Iterable[Window],
+    win_size: int,
+    workers: Optional[int] = None,
+    chunk_size: int = 256,
+    out: Optional[np.ndarray] = None,
+    dtype=np.float64,
+) -> Tuple[np.ndarray, List[str]]:
+    """Like `extract_matrix`, with windows sharded across worker processes.
+
+    Workers are forked, so features created by `windowize`/`summary`/... never
+    need to be pickled. On platforms without `fork`, or with a single worker,
+    this falls back to `extract_matrix` in the calling process.
+
+    Args:
+        features (Sequence[FeatureType]): The features, in column order, or a
+            FeaturePlan of them.
+        windows (Iterable[Window]): The windows, one row each.
+        win_size (int): Number of packets per window.
+        workers (Optional[int]): Number of worker processes. Defaults to
+            `os.cpu_count()`.
+        chunk_size (int): Number of windows per task.
+        out (Optional[np.ndarray]): Array the result is copied into. If None,
+            the shared matrix the workers wrote is returned; its memory is
+            freed with the last array using it.
+        dtype: dtype of the feature matrix.
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: The matrix and its column names.
+    """
+    plan = features if isinstance(features, FeaturePlan) else FeaturePlan(features)
+    names = plan.get_names(win_size)
+    windows = windows if isinstance(windows, list) else list(windows)
+    workers = os.cpu_count() if workers is None else workers
+
+    try:
+        context = mp.get_context("fork")
+    except ValueError:
+        context = None
+    if context is None or workers <= 1 or len(windows) <= chunk_size:
+        return extract_matrix(plan, windows, win_size, out=out, dtype=dtype)
+
+    shape = (len(windows), len(names))
+    size = int(np.prod(shape))
+    # MAP_SHARED, so rows written by the forked workers show up here.
+    buffer = mmap.mmap(-1, max(size * np.dtype(dtype).itemsize, 1))
+    matrix = np.frombuffer(buffer, dtype=dtype, count=size).reshape(shape)
+    job_id = next(_job_ids)
+    _jobs[job_id] = (plan, windows, matrix, win_size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            tasks = [
+                pool.submit(_extract_rows, job_id, start, min(start + chunk_size, len(windows)))
+                for start in range(0, len(windows), chunk_size)
+            ]
+            for task in tasks:
+                task.result()
+    finally:
+        _jobs.pop(job_id, None)
+
+    if out is None:
+        return matrix, names
+    out[...] = matrix
+    return out, names
@@ -0,0 +1,326 @@
+"""
+  Payloads of a given length and byte entropy
+
+  Replaying a script needs, for every entry, payload bytes whose entropy
+  matches `ScriptEntry.entropy`. Instead of drawing random bytes until one
+  comes close, `synthesize_payload` picks a byte-count histogram close to
+  the right entropy from a per-length table of candidates, corrects it by
+  redistributing a few bytes and lays it out as bytes. Payloads are cached
+  by (length, quantized entropy). For replays, `warm` precomputes every
+  payload of a script into a PayloadTable, which is unbounded, so sends
+  only do a dictionary lookup.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+RESOLUTION = 1e-4  # entropies closer than this share a payload
+_MAX_DOMINANT_COUNTS = 2048  # candidate counts of the dominant byte per length
+_MOVED_BYTES = 30  # bytes one step of _refine redistributes at most
+
+
+class EntropyTable(NamedTuple):
+    """Byte-count histograms of one payload length, sorted by entropy.
+
+    Histogram `i` has one byte occurring `dominant[i]` times and the rest of
+    the payload spread as evenly as possible over `others[i]` other bytes.
+    """
+
+    entropies: np.ndarray  # float64, increasing
+    dominant: np.ndarray  # int64
+    others: np.ndarray  # int64
+
+
+def _xlog2x(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.float64)
+    return x * np.log2(x, out=np.zeros_like(x), where=x > 0)
+
+
+@lru_cache(maxsize=16)
+def entropy_table(length: int) -> EntropyTable:
+    """Histograms reachable by a payload of `length` bytes, see EntropyTable.
+
+    Entropies use the formula of `counts_entropy`, so they are those
+    `Entropy.entropy` measures on the synthesized bytes.
+    """
+    if length <= 0:
+        return EntropyTable(np.zeros(1), np.zeros(1, np.int64), np.zeros(1, np.int64))
+
+    dominant = np.unique(np.linspace(1, length, min(length, _MAX_DOMINANT_COUNTS)).astype(np.int64))
+    others = np.arange(1, 256)
+    dominant, others = (a.ravel() for a in np.meshgrid(dominant, others, indexing="ij"))
+    rest = length - dominant
+    quotient, extra = np.divmod(rest, others)
+    bits = (
+        _xlog2x(np.array(length))
+        - _xlog2x(dominant)
+        - extra * _xlog2x(quotient + 1)
+        - (others - extra) * _xlog2x(quotient)
+    )
+    entropies = np.maximum(bits / length, 0.0)
+    # Every histogram of the full payload is the same, entropy 0.
+    entropies[rest == 0] = 0.0
+    others[rest == 0] = 0
+
+    order = np.argsort(entropies, kind="stable")
+    entropies, dominant, others = entropies[order], dominant[order], others[order]
+    distinct = np.ones(len(entropies), dtype=bool)
+    distinct[1:] = np.diff(entropies) > RESOLUTION / 100
+    return EntropyTable(entropies[distinct], dominant[distinct], others[distinct])
+
+
+def _table_histogram(length: int, idx: int) -> np.ndarray:
+    """Byte counts of histogram `idx` of `entropy_table(length)`."""
+    table = entropy_table(length)
+    dominant, others = int(table.dominant[idx]), int(table.others[idx])
+    counts = np.zeros(256, dtype=np.int64)
+    counts[0] = dominant
+    if others:
+        quotient, extra = divmod(length - dominant, others)
+        counts[1 : others + 1] = quotient
+        counts[1 : extra + 1] += 1
+    return counts
+
+
+class _Partitions(NamedTuple):
+    """Every partition of one number, sorted by the sum of `_xlog2x` of its parts."""
+
+    sums: np.ndarray  # float64, increasing
+    sizes: np.ndarray  # number of parts of each partition
+    parts: List[Tuple[int, ...]]
+
+
+@lru_cache(maxsize=1)
+def _partitions() -> List[_Partitions]:
+    """The partitions of 0 to _MOVED_BYTES, by number."""
+    xlog2x = _xlog2x(np.arange(_MOVED_BYTES + 1)).tolist()
+    result = []
+    for total in range(_MOVED_BYTES + 1):
+        found: List[Tuple[float, Tuple[int, ...]]] = []
+        stack = [(total, total, 0.0, ())]
+        while stack:
+            rest, largest, bits, parts = stack.pop()
+            if not rest:
+                found.append((bits, parts))
+            for part in range(min(rest, largest), 0, -1):
+                stack.append((rest - part, part, bits + xlog2x[part], parts + (part,)))
+        found.sort()
+        result.append(
+            _Partitions(
+                np.array([bits for bits, _ in found]),
+                np.array([len(parts) for _, parts in found], dtype=np.int64),
+                [parts for _, parts in found],
+            )
+        )
+    return result
+
+
+def _head_histogram(length: int, entropy: float) -> np.ndarray:
+    """Byte counts with the entropy closest to `entropy` among one byte
+    occurring all but `rest <= _MOVED_BYTES` times and any histogram of the
+    `rest` other bytes, the shape of low entropy payloads."""
+    total = float(_xlog2x(np.array(length)))
+    best_error, best = np.inf, (0, 0)
+    for rest, partitions in enumerate(_partitions()[: length + 1]):
+        head = float(_xlog2x(np.array(length - rest)))
+        errors = np.abs((total - head - partitions.sums) / length - entropy)
+        idx = int(np.argmin(errors))
+        if errors[idx] < best_error:
+            best_error, best = errors[idx], (rest, idx)
+    rest, idx = best
+    parts = _partitions()[rest].parts[idx]
+    counts = np.zeros(256, dtype=np.int64)
+    counts[0] = length - rest
+    counts[1 : len(parts) + 1] = parts
+    return counts
+
+
+def payload_histogram(length: int, entropy: float) -> np.ndarray:
+    """Byte counts of a `length` byte payload with an entropy close to `entropy`.
+
+    The two histograms of `entropy_table(length)` around `entropy`, then the
+    closest of `_head_histogram`, are refined with `_refine` until one is
+    within RESOLUTION / 2; otherwise the closest result is returned.
+
+    Returns:
+        np.ndarray: 256 counts, summing to `length`.
+    """
+    if length <= 0:
+        return np.zeros(256, dtype=np.int64)
+    table = entropy_table(length)
+    idx = int(np.searchsorted(table.entropies, entropy))
+    around = range(max(idx - 1, 0), min(idx + 1, len(table.entropies)))
+    # Nearest first, so the result is never further than the table's best.
+    around = sorted(around, key=lambda i: abs(table.entropies[i] - entropy))
+    candidates = [_table_histogram(length, i) for i in around] + [_head_histogram(length, entropy)]
+    total = float(_xlog2x(np.array(length)))
+    best_error, best = np.inf, candidates[0]
+    for counts in candidates:
+        counts = _refine(counts, entropy)
+        error = abs((total - float(_xlog2x(counts).sum())) / length - entropy)
+        if error < best_error:
+            best_error, best = error, counts
+        if error < RESOLUTION / 2:
+            break
+    return best
+
+
+def _refine(counts: np.ndarray, entropy: float, max_steps: int = 3) -> np.ndarray:
+    """Redistribute a few bytes of `counts` while that brings its entropy
+    closer to `entropy`.
+
+    Each step takes `d` occurrences from one symbol and every occurrence of
+    `k` symbols that share a count, at most _MOVED_BYTES in all, and spreads
+    them over new symbols as whichever partition of their number comes
+    closest. With the partitions sorted by their contribution to the
+    entropy, the best of every such move is found by binary search, which
+    reaches entropies that moving single bytes, or the few histograms of a
+    short payload's EntropyTable, do not.
+    """
+    length = int(counts.sum())
+    target = float(_xlog2x(np.array(length))) - entropy * length
+    partitions = _partitions()
+    steps = np.arange(_MOVED_BYTES + 1)
+    for _ in range(max_steps):
+        current = float(_xlog2x(counts).sum())
+        if abs(current - target) < RESOLUTION / 2 * length:
+            break
+        values, multiplicity = np.unique(counts[counts > 0], return_counts=True)
+        # Takes of d occurrences from a symbol with count values[i] ...
+        i, d = (x.ravel() for x in np.meshgrid(np.arange(len(values)), steps, indexing="ij"))
+        keep = d <= values[i]
+        i, d = i[keep, None], d[keep, None]
+        # ... combined with emptying k symbols with count values[j].
+        j, k = (x.ravel() for x in np.meshgrid(np.arange(len(values)), steps, indexing="ij"))
+        keep = (k <= multiplicity[j]) & (k * values[j] <= _MOVED_BYTES)
+        j, k = j[keep, None].T, k[keep, None].T
+        moved = d + k * values[j]
+        valid = (moved <= _MOVED_BYTES) & ((i != j) | (k + (d > 0) <= multiplicity[i]))
+        change = _xlog2x(values[i] - d) - _xlog2x(values[i]) - k * _xlog2x(values[j])
+        # Symbols free to hold the parts of the partition.
+        free = 256 - len(np.flatnonzero(counts)) + (values[i] == d) + k
+        i, d, j, k = (np.broadcast_to(x, valid.shape)[valid] for x in (i, d, j, k))
+        moved, change, free = moved[valid], change[valid], free[valid]
+
+        best_error, best = abs(current - target), None
+        for total in range(1, _MOVED_BYTES + 1):
+            rows = np.flatnonzero(moved == total)
+            options = partitions[total]
+            if not len(rows):
+                continue
+            needed = target - current - change[rows]
+            above = np.minimum(np.searchsorted(options.sums, needed), len(options.sums) - 1)
+            for idx in (np.maximum(above - 1, 0), above):
+                errors = np.abs(needed - options.sums[idx])
+                errors[options.sizes[idx] > free[rows]] = np.inf
+                row = int(np.argmin(errors))
+                if errors[row] < best_error:
+                    best_error, best = errors[row], (rows[row], total, int(idx[row]))
+        if best is None:
+            break
+        row, total, idx = best
+        if d[row]:
+            source = int(np.flatnonzero(counts == values[i[row]])[0])
+            counts[source] -= d[row]
+        else:
+            source = -1
+        emptied = np.flatnonzero(counts == values[j[row]])
+        counts[emptied[emptied != source][: k[row]]] = 0
+        for part in partitions[total].parts[idx]:
+            counts[int(np.flatnonzero(counts == 0)[0])] = part
+    return counts
+
+
+def _key(length: int, entropy: float) -> Tuple[int, int]:
+    """(length, entropy in units of RESOLUTION) of a payload."""
+    return max(int(length), 0), int(round(min(max(entropy, 0.0), 8.0) / RESOLUTION))
+
+
+def _synthesize(length: int, level: int) -> bytes:
+    counts = payload_histogram(length, level * RESOLUTION)
+    # Seeded by the key, so a payload does not depend on what was cached before.
+    rng = np.random.default_rng((length, level))
+    symbols = rng.permutation(256).astype(np.uint8)
+    return rng.permutation(np.repeat(symbols, counts)).tobytes()
+
+
+@lru_cache(maxsize=4096)
+def _payload(length: int, level: int) -> bytes:
+    return _synthesize(length, level)
+
+
+def synthesize_payload(length: int, entropy: float) -> bytes:
+    """Bytes of the given length whose entropy, as measured by
+    `Entropy.entropy`, is as close to `entropy` as the length allows.
+
+    From 300 bytes on, every entropy between 0.5 and 7.5 bits is met to
+    within RESOLUTION, nearly always RESOLUTION / 2. Shorter payloads reach
+    fewer entropies, and at most `log2(length)` bits; close to 0 bits, the
+    entropies reachable by any payload of the length are sparse.
+    The same (length, entropy to RESOLUTION) always gives the same bytes.
+    Only the 4096 most recent payloads are cached, so a replay should look
+    its payloads up in the PayloadTable of `warm` instead.
+
+    Args:
+        length (int): Number of bytes.
+        entropy (float): Target entropy in bits, between 0 and 8.
+
+    Returns:
+        bytes: The payload.
+    """
+    return _payload(*_key(length, entropy))
+
+
+class PayloadTable:
+    """Payloads synthesized ahead of use by `warm`, never evicted.
+
+    Usage:
+        ```
+        table = warm(sizes, entropies)
+        for entry in script:
+            send(table.payload(entry.size, entry.entropy))
+        ```
+    """
+
+    def __init__(self):
+        self._payloads: Dict[Tuple[int, int], bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def __contains__(self, pair: Tuple[int, float]) -> bool:
+        return _key(*pair) in self._payloads
+
+    def payload(self, length: int, entropy: float) -> bytes:
+        """The payload `synthesize_payload(length, entropy)` returns.
+
+        Raises:
+            KeyError: If the pair was not warmed.
+        """
+        try:
+            return self._payloads[_key(length, entropy)]
+        except KeyError:
+            raise KeyError(f"No payload of {length} bytes and entropy {entropy} was warmed") from None
+
+
+def warm(
+    lengths: Iterable[int], entropies: Iterable[float], table: Optional[PayloadTable] = None
+) -> PayloadTable:
+    """Synthesize the payloads of many (length, entropy) pairs ahead of use,
+    e.g. those of every entry of a script before replaying it.
+
+    Args:
+        lengths (Iterable[int]): Payload lengths.
+        entropies (Iterable[float]): Target entropies, one per length.
+        table (Optional[PayloadTable]): A table to add the payloads to.
+
+    Returns:
+        PayloadTable: The table holding every requested payload.
+    """
+    table = PayloadTable() if table is None else table
+    keys = {_key(length, entropy) for length, entropy in zip(lengths, entropies)}
+    # By length, so each entropy_table is built once.
+    for key in sorted(keys - table._payloads.keys()):
+        table._payloads[key] = _synthesize(*key)
+    return table
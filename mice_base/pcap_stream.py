@@ -0,0 +1,285 @@
+"""
+  Streaming pcap/pcapng ingestion: file -> RawPkt -> Flow -> Window
+
+  Capture files are memory-mapped and walked record by record, so only the
+  packets of live flows that still have an unfinished window are held in
+  memory.
+"""
+import mmap
+import struct
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+# MICE
+from .fe_types import FlowID, Pkts, RawPkt, Window, WindowID
+from .flow_table import Eviction, FlowEntry, FlowTable, flow_name
+
+_PCAP_MAGIC = {
+    # magic: (byte order, timestamp units per second)
+    b"\xd4\xc3\xb2\xa1": ("<", 1_000_000),
+    b"\xa1\xb2\xc3\xd4": (">", 1_000_000),
+    b"\x4d\x3c\xb2\xa1": ("<", 1_000_000_000),
+    b"\xa1\xb2\x3c\x4d": (">", 1_000_000_000),
+}
+_PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+_PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+_PCAPNG_IDB = 1
+_PCAPNG_PB = 2
+_PCAPNG_SPB = 3
+_PCAPNG_EPB = 6
+_PCAPNG_OPT_END = 0
+_PCAPNG_OPT_TSRESOL = 9
+_PCAPNG_OPT_TSOFFSET = 14
+
+
+class _Interface(NamedTuple):
+    linktype: int
+    units: float  # timestamp units per second
+    offset: int  # seconds added to every timestamp
+
+
+def iter_packets(path: str) -> Iterator[RawPkt]:
+    """Lazily read every frame of a pcap or pcapng file.
+
+    Args:
+        path (str): Path to the capture file.
+
+    Yields:
+        RawPkt: The frames in file order, with their timestamp and link type.
+
+    Raises:
+        ValueError: If the file is neither pcap nor pcapng, or a pcapng packet
+            block is malformed. A capture truncated mid-record just ends.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with mm:
+            magic = mm[:4]
+            if magic in _PCAP_MAGIC:
+                yield from _iter_pcap(mm, *_PCAP_MAGIC[magic])
+            elif magic == _PCAPNG_SHB:
+                yield from _iter_pcapng(mm)
+            else:
+                raise ValueError(f"{path} is not a pcap or pcapng file")
+
+
+def _iter_pcap(mm: mmap.mmap, order: str, units: int) -> Iterator[RawPkt]:
+    (linktype,) = struct.unpack_from(order + "I", mm, 20)
+    linktype &= 0xFFFF  # upper bits may carry FCS information
+    record = struct.Struct(order + "IIII")
+    offset = 24
+    end = len(mm)
+    while offset + record.size <= end:
+        sec, frac, caplen, _ = record.unpack_from(mm, offset)
+        offset += record.size
+        if offset + caplen > end:  # truncated capture
+            return
+        yield RawPkt(sec + frac / units, mm[offset : offset + caplen], linktype)
+        offset += caplen
+
+
+def _iter_pcapng(mm: mmap.mmap) -> Iterator[RawPkt]:
+    order = "<"
+    interfaces: List[_Interface] = []
+    offset = 0
+    end = len(mm)
+    while offset + 12 <= end:
+        block_type = mm[offset : offset + 4]
+        if block_type == _PCAPNG_SHB:
+            (byte_order,) = struct.unpack_from("<I", mm, offset + 8)
+            order = "<" if byte_order == _PCAPNG_BYTE_ORDER_MAGIC else ">"
+            interfaces = []
+        block_type, block_len = struct.unpack_from(order + "II", mm, offset)
+        if block_len < 12 or offset + block_len > end:
+            return
+        body = offset + 8
+        body_end = offset + block_len - 4
+
+        if block_type == _PCAPNG_IDB:
+            (linktype,) = struct.unpack_from(order + "H", mm, body)
+            interfaces.append(_read_interface(mm, order, linktype, body + 8, body_end))
+        elif block_type in (_PCAPNG_EPB, _PCAPNG_PB):
+            _check_header(offset, body + 20, body_end)
+            if block_type == _PCAPNG_EPB:
+                iface, ts_high, ts_low, caplen, _ = struct.unpack_from(order + "IIIII", mm, body)
+            else:
+                iface, _, ts_high, ts_low, caplen, _ = struct.unpack_from(order + "HHIIII", mm, body)
+            _check_caplen(offset, body + 20, caplen, body_end)
+            iface = _interface(interfaces, iface, offset)
+            yield _pcapng_packet(mm, iface, ts_high, ts_low, body + 20, caplen)
+        elif block_type == _PCAPNG_SPB:
+            _check_header(offset, body + 4, body_end)
+            (length,) = struct.unpack_from(order + "I", mm, body)
+            caplen = min(length, body_end - body - 4)
+            # Simple packet blocks carry no timestamp.
+            linktype = _interface(interfaces, 0, offset).linktype
+            yield RawPkt(0.0, mm[body + 4 : body + 4 + caplen], linktype)
+
+        offset += block_len
+
+
+def _interface(interfaces: List[_Interface], iface: int, offset: int) -> _Interface:
+    """Interface `iface` of the packet block at `offset`.
+
+    Raises:
+        ValueError: If no interface description block described it.
+    """
+    if iface >= len(interfaces):
+        raise ValueError(
+            f"pcapng packet block at offset {offset} refers to interface {iface}, "
+            f"but only {len(interfaces)} interfaces were described before it"
+        )
+    return interfaces[iface]
+
+
+def _check_header(offset: int, header_end: int, body_end: int) -> None:
+    """Check that the packet block at `offset` holds its fixed fields.
+
+    Raises:
+        ValueError: If it is too short.
+    """
+    if header_end > body_end:
+        raise ValueError(f"pcapng packet block at offset {offset} is too short for its header")
+
+
+def _check_caplen(offset: int, data: int, caplen: int, body_end: int) -> None:
+    """Check that the `caplen` bytes of the packet block at `offset`, from
+    `data` on, lie within its body.
+
+    Raises:
+        ValueError: If they do not.
+    """
+    if data + caplen > body_end:
+        raise ValueError(
+            f"pcapng packet block at offset {offset} claims {caplen} captured bytes, "
+            f"more than its {max(body_end - data, 0)} bytes of packet data"
+        )
+
+
+def _read_interface(
+    mm: mmap.mmap, order: str, linktype: int, offset: int, end: int
+) -> _Interface:
+    units = 1_000_000
+    ts_offset = 0
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(order + "HH", mm, offset)
+        if code == _PCAPNG_OPT_END:
+            break
+        if code == _PCAPNG_OPT_TSRESOL:
+            resol = mm[offset + 4]
+            units = 2 ** (resol & 0x7F) if resol & 0x80 else 10 ** resol
+        elif code == _PCAPNG_OPT_TSOFFSET:
+            (ts_offset,) = struct.unpack_from(order + "q", mm, offset + 4)
+        offset += 4 + (length + 3) // 4 * 4
+    return _Interface(linktype, units, ts_offset)
+
+
+def _pcapng_packet(
+    mm: mmap.mmap, iface: _Interface, ts_high: int, ts_low: int, offset: int, caplen: int
+) -> RawPkt:
+    time = iface.offset + ((ts_high << 32) | ts_low) / iface.units
+    return RawPkt(time, mm[offset : offset + caplen], iface.linktype)
+
+
+class _FlowWindows(FlowEntry):
+    """Flow entry that only buffers the packets of its next window."""
+
+    def __init__(self, fid: FlowID, time: float, win_size: int, stride: int):
+        super().__init__(fid, time)
+        self.name = flow_name(fid)
+        self.win_size = win_size
+        self.stride = stride
+        self.skip = 0  # packets to drop before the next window starts
+        self.covered = 0  # packets already part of an emitted window
+
+    def add(self, pkt) -> None:
+        if self.skip:
+            self.skip -= 1
+            self.seen += 1
+            return
+        super().add(pkt)
+
+    def take(self) -> List:
+        """The packets no emitted window covers yet, if there are any."""
+        uncovered = self.seen > self.covered
+        pkts = super().take()
+        self.skip = 0
+        self.covered = self.seen
+        return pkts if uncovered else []
+
+    def next_window(self) -> Optional[Window]:
+        if len(self.pkts) < self.win_size:
+            return None
+        window = self.window(self.start, self.pkts[: self.win_size])
+        self.covered = self.start + self.win_size
+        del self.pkts[: self.stride]
+        self.skip = max(self.stride - self.win_size, 0)
+        self.start += self.stride
+        return window
+
+    def window(self, start: int, pkts: List) -> Window:
+        window_id: WindowID = f"{self.name}_{start}"
+        return Window(window_id, start, start + len(pkts), self.fid, Pkts(window_id, pkts))
+
+
+def iter_windows(
+    pkts: Iterable,
+    win_size: int,
+    stride: Optional[int] = None,
+    emit_partial: bool = True,
+    idle_timeout: Optional[float] = 120.0,
+    active_timeout: Optional[float] = None,
+    max_flows: Optional[int] = None,
+) -> Iterator[Window]:
+    """Group a packet stream into flows and yield each window once it is full.
+
+    Window `k` of a flow covers its packets `k * stride` to
+    `k * stride + win_size`. Flows are tracked by a FlowTable, so both
+    directions land in the same flow, whose FlowID is oriented like its first
+    packet, and idle flows are evicted. Packets without an IPv4 header are
+    dropped.
+
+    Args:
+        pkts (Iterable): RawPkts or scapy packets, in capture order.
+        win_size (int): Number of packets per window.
+        stride (Optional[int]): Packets between window starts. Defaults to
+            `win_size`, i.e. non-overlapping windows.
+        emit_partial (bool): Whether to emit a final, shorter window for the
+            packets at the end of a flow that no full window covered.
+        idle_timeout (Optional[float]): See FlowTable.
+        active_timeout (Optional[float]): See FlowTable. Each segment of a
+            flow is windowed separately.
+        max_flows (Optional[int]): See FlowTable.
+
+    Yields:
+        Window: Windows in the order they complete.
+    """
+    stride = win_size if stride is None else stride
+    table = FlowTable(
+        idle_timeout,
+        active_timeout,
+        max_flows=max_flows,
+        entry_factory=lambda fid, time: _FlowWindows(fid, time, win_size, stride),
+    )
+
+    def tails(evicted: List[Eviction]) -> Iterator[Window]:
+        for eviction in evicted:
+            if eviction.pkts and (emit_partial or len(eviction.pkts) == win_size):
+                yield eviction.entry.window(eviction.start, eviction.pkts)
+
+    for pkt in pkts:
+        entry, evicted = table.add(pkt)
+        yield from tails(evicted)
+        if entry is not None:
+            window = entry.next_window()
+            if window is not None:
+                yield window
+
+    yield from tails(table.flush())
+
+
+def stream_windows(path: str, win_size: int, stride: Optional[int] = None, **kwargs) -> Iterator[Window]:
+    """Windows of every flow in a pcap/pcapng file, see `iter_windows`."""
+    return iter_windows(iter_packets(path), win_size, stride, **kwargs)
@@ -0,0 +1,132 @@
+"""
+  Evaluation plans for sets of window features
+
+  A FeaturePlan resolves the dependency DAG of the requested features (see
+  `WindowFeature.dependencies` and the flowchart in the README), so every
+  intermediate, e.g. Directions, is computed exactly once per window no
+  matter how many requested features build on it.
+"""
+from typing import Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+# MICE
+from .fe_types import FlowID, Pkts, Window
+from .BaseFeatures.WindowFeature import WindowFeature
+
+FeatureType = Type[WindowFeature]
+
+
+def resolve(features: Sequence[FeatureType]) -> List[FeatureType]:
+    """Every feature needed for `features`, dependencies before dependents.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle.
+    """
+    order: List[FeatureType] = []
+    done = set()
+    visiting = set()
+
+    def visit(feature: FeatureType):
+        if feature in done:
+            return
+        if feature in visiting:
+            raise ValueError(f"Dependency cycle through {feature.__name__}")
+        visiting.add(feature)
+        for dependency in feature.dependencies:
+            visit(dependency)
+        visiting.remove(feature)
+        done.add(feature)
+        order.append(feature)
+
+    for feature in features:
+        visit(feature)
+    return order
+
+
+class FeaturePlan:
+    """Computes a list of features together, sharing their intermediates.
+
+    A plan exposes the same `get_names`/`get_value` interface as a single
+    WindowFeature, with the columns of `features` concatenated in order.
+
+    Args:
+        features (Sequence[FeatureType]): The requested features.
+    """
+
+    def __init__(self, features: Sequence[FeatureType]):
+        self.features = list(features)
+        self.order = resolve(self.features)
+
+    def get_names(self, win_size: int) -> List[str]:
+        return [name for feature in self.features for name in feature.get_names(win_size)]
+
+    def evaluate(
+        self,
+        fid: Optional[FlowID],
+        pkts: Pkts,
+        win_size: int,
+        known: Optional[Dict[FeatureType, List[float]]] = None,
+    ) -> Dict[FeatureType, List[float]]:
+        """Values of every feature in the plan, including intermediates.
+
+        Features in `known` take the given values instead of being computed.
+        """
+        values: Dict[FeatureType, List[float]] = dict(known or {})
+        for feature in self.order:
+            if feature in values:
+                continue
+            if feature.dependencies:
+                values[feature] = feature.derive(
+                    win_size, *(values[dependency] for dependency in feature.dependencies)
+                )
+            else:
+                values[feature] = feature.get_value(fid, pkts, win_size)
+        return values
+
+    def evaluate_batch(
+        self,
+        windows: Sequence[Window],
+        win_size: int,
+        known: Optional[Dict[FeatureType, np.ndarray]] = None,
+    ) -> Dict[FeatureType, np.ndarray]:
+        """Values of every feature in the plan for many windows at once.
+
+        Features without dependencies are computed window by window; derived
+        features use their `derive_batch` when they have one.
+
+        Args:
+            windows (Sequence[Window]): The windows.
+            win_size (int): Number of packets per window.
+            known (Optional[Dict[FeatureType, np.ndarray]]): Values of some
+                features for these windows, which are used instead of being
+                computed.
+
+        Returns:
+            Dict[FeatureType, np.ndarray]: One `(len(windows), n_names)` array
+                per feature.
+        """
+        values: Dict[FeatureType, np.ndarray] = dict(known or {})
+        for feature in self.order:
+            if feature in values:
+                continue
+            width = len(feature.get_names(win_size))
+            if not feature.dependencies:
+                rows = [feature.get_value(window.fid, window.data, win_size) for window in windows]
+                values[feature] = np.array(rows, dtype=np.float64).reshape(len(windows), width)
+                continue
+
+            inputs = [values[dependency] for dependency in feature.dependencies]
+            if feature.derive_batch is not None:
+                values[feature] = feature.derive_batch(win_size, *inputs)
+            else:
+                rows = [
+                    feature.derive(win_size, *(column[row].tolist() for column in inputs))
+                    for row in range(len(windows))
+                ]
+                values[feature] = np.array(rows, dtype=np.float64).reshape(len(windows), width)
+        return values
+
+    def get_value(self, fid: Optional[FlowID], pkts: Pkts, win_size: int) -> List[float]:
+        values = self.evaluate(fid, pkts, win_size)
+        return [value for feature in self.features for value in values[feature]]
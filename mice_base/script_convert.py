@@ -0,0 +1,130 @@
+"""
+  Batched conversion between BaseData arrays and scripts
+
+  Generated samples are `(n_samples, 3, W)` arrays of directions, sizes and
+  entropies, the layout of `BaseDataArray`. `to_scripts` turns a whole batch
+  into ScriptColumns with array operations only, and `from_scripts` packs
+  scripts back into such an array for evaluation.
+"""
+from typing import List, Sequence, Union
+
+import numpy as np
+
+# MICE
+from .Script import Origin, Protocol, ScriptEntry
+from .script_io import ScriptColumns, pack_strings
+from .BaseFeatures.Entropies import Entropy
+
+Script = Union[ScriptColumns, Sequence[ScriptEntry]]
+
+_CLIENT = list(Origin).index(Origin.CLIENT)
+_SERVER = list(Origin).index(Origin.SERVER)
+_NO_SAMPLES = pack_strings([])
+
+
+def _ids(n: int):
+    """String table of the ids "0" to `str(n - 1)`, a prefix of which names
+    the entries of every script."""
+    return pack_strings([str(idx) for idx in range(n)])
+
+
+def to_scripts(
+    data: np.ndarray, protocol: Protocol = Protocol.TCP, as_entries: bool = False
+) -> Union[List[ScriptColumns], List[List[ScriptEntry]]]:
+    """Scripts of a batch of samples.
+
+    Packets with a size that rounds to 0 or less are padding and skipped.
+    Positive directions are sent by the client, the others by the server;
+    sizes are rounded to integers and entropies clipped to Entropy's range.
+    Sizes are kept in the units of the data, i.e. the payload sizes of the
+    Size feature, not the on-wire sizes ScriptEntry.size usually holds: add
+    the header sizes before replaying them as frames. `from_scripts` reads
+    them back unchanged, so a round trip keeps the units.
+    Entries are named "0", "1", ... in order. Every packet of a burst
+    depends on the last packet of the previous burst, so a side only
+    answers once the other side's burst has arrived; the first burst has no
+    dependence. Flags and delays are 0.
+
+    Args:
+        data (np.ndarray): An `(n_samples, 3, W)` array of directions, sizes
+            and entropies.
+        protocol (Protocol): Protocol of every entry.
+        as_entries (bool): Return lists of ScriptEntry instead of ScriptColumns.
+
+    Returns:
+        Union[List[ScriptColumns], List[List[ScriptEntry]]]: One script per sample.
+
+    Raises:
+        ValueError: If `data` is not of shape `(n_samples, 3, W)`.
+    """
+    data = np.asarray(data)
+    if data.ndim != 3 or data.shape[1] != 3:
+        raise ValueError(f"Expected an (n_samples, 3, W) array, got shape {data.shape}")
+    n_samples, _, width = data.shape
+
+    sizes = np.rint(data[:, 1]).astype(np.int64)
+    keep = sizes > 0
+    lengths = keep.sum(axis=1)
+    starts = np.zeros(n_samples + 1, dtype=np.int64)
+    np.cumsum(lengths, out=starts[1:])
+
+    origin = np.where(data[:, 0][keep] > 0, _CLIENT, _SERVER).astype(np.uint8)
+    size = sizes[keep]
+    entropy = np.clip(data[:, 2][keep].astype(np.float64), Entropy.min(), Entropy.max())
+
+    # Dependences, as indices into the flat arrays of all kept packets.
+    positions = np.arange(len(origin))
+    first = np.zeros(len(origin), dtype=bool)
+    first[starts[:-1][lengths > 0]] = True
+    burst_start = first.copy()
+    burst_start[1:] |= origin[1:] != origin[:-1]
+    burst_start = np.maximum.accumulate(np.where(burst_start, positions, 0))
+    sample_start = np.repeat(starts[:-1], lengths)
+    dependence = np.where(burst_start > sample_start, burst_start - 1 - sample_start, -1)
+
+    protocol_code = list(Protocol).index(Protocol(protocol))
+    blob, offsets = _ids(int(lengths.max(initial=0)))
+    scripts = []
+    for start, stop in zip(starts[:-1].tolist(), starts[1:].tolist()):
+        count = stop - start
+        script = ScriptColumns(
+            (blob[: offsets[count]], offsets[: count + 1]),
+            origin[start:stop],
+            size[start:stop],
+            entropy[start:stop],
+            np.full(count, protocol_code, dtype=np.uint8),
+            np.zeros(count, dtype=np.int64),
+            dependence[start:stop],
+            np.zeros(count, dtype=np.int64),
+            np.full(count, -1, dtype=np.int64),
+            _NO_SAMPLES,
+        )
+        scripts.append(script.to_entries() if as_entries else script)
+    return scripts
+
+
+def from_scripts(scripts: Sequence[Script], win_size: int) -> np.ndarray:
+    """Directions, sizes and entropies of the first `win_size` entries of
+    every script, zero padded like `windowize`. Sizes are copied unchanged,
+    see `to_scripts`.
+
+    Args:
+        scripts (Sequence[Script]): ScriptColumns or lists of ScriptEntry.
+        win_size (int): Number of packets per sample.
+
+    Returns:
+        np.ndarray: An `(n_samples, 3, win_size)` array.
+    """
+    columns = [s if isinstance(s, ScriptColumns) else ScriptColumns.from_entries(s) for s in scripts]
+    data = np.zeros((len(columns), 3, win_size))
+    lengths = np.array([min(len(c), win_size) for c in columns], dtype=np.int64)
+    if not lengths.sum():
+        return data
+
+    rows = np.repeat(np.arange(len(columns)), lengths)
+    cols = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    origin = np.concatenate([c.origin[:k] for c, k in zip(columns, lengths)])
+    data[rows, 0, cols] = np.where(origin == _CLIENT, 1.0, -1.0)
+    data[rows, 1, cols] = np.concatenate([c.size[:k] for c, k in zip(columns, lengths)])
+    data[rows, 2, cols] = np.concatenate([c.entropy[:k] for c, k in zip(columns, lengths)])
+    return data
@@ -0,0 +1,252 @@
+"""
+  Compiled dependency graphs of scripts
+
+  A ScriptGraph resolves the `dependence` ids of one or many scripts into
+  entry indices once, then orders and schedules every script together with
+  NumPy: each step of the topological sort handles the ready entries of all
+  scripts at once, so validating thousands of scripts takes as many steps as
+  the longest dependency chain, not one Python iteration per entry.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+# MICE
+from .Script import Origin, ScriptEntry
+from .script_io import ScriptColumns, unpack_strings
+
+Script = Union[ScriptColumns, Sequence[ScriptEntry]]
+
+
+class LatencyModel(NamedTuple):
+    """Time for a packet to reach the other side: `one_way_ms + size * ms_per_byte`."""
+
+    one_way_ms: float = 0.0
+    ms_per_byte: float = 0.0
+
+    def transit(self, sizes: np.ndarray) -> np.ndarray:
+        return self.one_way_ms + sizes * self.ms_per_byte
+
+
+class Timeline(NamedTuple):
+    send: np.ndarray  # ms from the start of its script each entry is sent at, NaN if never
+    arrival: np.ndarray  # ms each entry reaches the other side at, NaN if never
+
+
+def _ranges(starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Concatenation of `np.arange(start, stop)` for every pair."""
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class ScriptGraph:
+    """Dependency graph of one or more scripts, indexed for fast scheduling.
+
+    Entries of all scripts are numbered consecutively, script `k` holding
+    `offsets[k]` to `offsets[k + 1]`. An entry may only depend on an entry of
+    its own script; a `dependence` of None or "" (unless "" is an id) means
+    none.
+
+    Usage:
+        ```
+        graph = ScriptGraph.compile(scripts)
+        problems = graph.validate()
+        timeline = graph.timeline(LatencyModel(one_way_ms=20.0))
+        ```
+
+    Args:
+        scripts (Sequence[ScriptColumns]): The scripts.
+    """
+
+    def __init__(self, scripts: Sequence[ScriptColumns]):
+        lengths = [len(script) for script in scripts]
+        self.offsets = np.zeros(len(scripts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self._scripts = list(scripts)
+        self._index: Dict[int, Dict[str, int]] = {}
+
+        n = int(self.offsets[-1])
+        self.origin = np.concatenate([s.origin for s in scripts] or [np.zeros(0, np.uint8)])
+        self.size = np.concatenate([s.size for s in scripts] or [np.zeros(0, np.int64)])
+        self.delay = np.concatenate([s.delay for s in scripts] or [np.zeros(0, np.int64)])
+
+        # Dependence of each entry: its global index, -1 for none, -2 if it is
+        # not the id of an entry of the script.
+        dependence = np.full(n, -1, dtype=np.int64)
+        for script, start, length in zip(scripts, self.offsets, lengths):
+            local = script.dependence
+            name_lengths = np.diff(script.names[1])
+            has = local >= 0
+            internal = has & (local < length)
+            external = has & ~internal
+            empty = np.zeros(length, dtype=bool)
+            empty[external] = name_lengths[local[external]] == 0
+            deps = np.where(internal, local + start, -1)
+            deps[external & ~empty] = -2
+            dependence[start : start + length] = deps
+        self.dependence = dependence
+
+        # Previous entry of the same origin in the same script, -1 for none.
+        self.previous = np.full(n, -1, dtype=np.int64)
+        script_ids = np.repeat(np.arange(len(scripts)), lengths)
+        keys = script_ids * (len(Origin) + 1) + self.origin
+        ordered = np.argsort(keys, kind="stable")
+        same = keys[ordered[1:]] == keys[ordered[:-1]]
+        self.previous[ordered[1:][same]] = ordered[:-1][same]
+
+        self._order: Optional[np.ndarray] = None
+
+    @classmethod
+    def compile(cls, scripts: Sequence[Script]) -> "ScriptGraph":
+        """Graph of scripts given as ScriptColumns or lists of ScriptEntry."""
+        return cls(
+            [s if isinstance(s, ScriptColumns) else ScriptColumns.from_entries(s) for s in scripts]
+        )
+
+    def __len__(self) -> int:
+        return len(self.dependence)
+
+    @property
+    def n_scripts(self) -> int:
+        return len(self.offsets) - 1
+
+    def index(self, entry_id: str, script: int = 0) -> int:
+        """Global index of the entry `entry_id` of a script.
+
+        Raises:
+            KeyError: If the script has no such entry.
+        """
+        if script not in self._index:
+            columns = self._scripts[script]
+            ids = unpack_strings(*columns.names)[: len(columns)]
+            start = int(self.offsets[script])
+            index: Dict[str, int] = {}
+            for idx, name in enumerate(ids):
+                index.setdefault(name, start + idx)
+            self._index[script] = index
+        return self._index[script][entry_id]
+
+    @property
+    def dangling(self) -> np.ndarray:
+        """Entries whose dependence is not an entry of their script."""
+        return np.flatnonzero(self.dependence == -2)
+
+    def _sort(self, parents: Sequence[np.ndarray], visit=None) -> np.ndarray:
+        """Kahn's algorithm, one NumPy step per level of the graph.
+
+        Args:
+            parents (Sequence[np.ndarray]): Arrays of the parent of each entry
+                along one kind of edge, -1 for none and -2 for one that never
+                becomes ready.
+            visit: Called with each level, once its parents have been visited.
+
+        Returns:
+            np.ndarray: Every entry that can be reached, level by level.
+        """
+        n = len(self)
+        pending = np.zeros(n, dtype=np.int64)
+        sources, targets = [], []
+        for parent in parents:
+            pending += parent != -1
+            edge = parent >= 0
+            sources.append(parent[edge])
+            targets.append(np.flatnonzero(edge))
+        sources = np.concatenate(sources)
+        ordered = np.argsort(sources, kind="stable")
+        children = np.concatenate(targets)[ordered]
+        starts = np.searchsorted(sources[ordered], np.arange(n + 1))
+
+        levels = []
+        level = np.flatnonzero(pending == 0)
+        while level.size:
+            if visit is not None:
+                visit(level)
+            levels.append(level)
+            reached = children[_ranges(starts[level], starts[level + 1])]
+            np.subtract.at(pending, reached, 1)
+            reached = np.unique(reached)
+            level = reached[pending[reached] == 0]
+        return np.concatenate(levels) if levels else np.zeros(0, dtype=np.int64)
+
+    @property
+    def order(self) -> np.ndarray:
+        """Entries in dependency order, each after the entry it depends on.
+
+        Entries with a dangling dependence come first, like entries without
+        one; entries on or behind a dependency cycle are left out.
+        """
+        if self._order is None:
+            self._order = self._sort([np.where(self.dependence == -2, -1, self.dependence)])
+        return self._order
+
+    @property
+    def cyclic(self) -> np.ndarray:
+        """Entries on a dependency cycle, or depending on one."""
+        reached = np.zeros(len(self), dtype=bool)
+        reached[self.order] = True
+        return np.flatnonzero(~reached)
+
+    def validate(self) -> List[str]:
+        """Problems of every script, an empty list if there are none."""
+        problems = []
+        script_of = np.repeat(np.arange(self.n_scripts), np.diff(self.offsets))
+        for idx in self.dangling.tolist():
+            problems.append(
+                f"script {script_of[idx]}: entry {idx - self.offsets[script_of[idx]]} "
+                "depends on an unknown id"
+            )
+        for idx in self.cyclic.tolist():
+            problems.append(
+                f"script {script_of[idx]}: entry {idx - self.offsets[script_of[idx]]} "
+                "is on or behind a dependency cycle"
+            )
+        for script, columns in enumerate(self._scripts):
+            ids = unpack_strings(*columns.names)[: len(columns)]
+            if len(set(ids)) != len(ids):
+                problems.append(f"script {script}: ids are not unique")
+        return problems
+
+    def timeline(self, latency: LatencyModel = LatencyModel()) -> Timeline:
+        """When every entry is sent and arrives, for all scripts at once.
+
+        Each side sends its entries in script order. An entry is sent `delay`
+        ms after its dependence has been sent (same origin) or has arrived
+        (other origin), and after the previous entry of its origin was sent.
+        Entries that can never be sent, because of a dangling dependence or a
+        cycle, get NaN.
+
+        Args:
+            latency (LatencyModel): Transit time of entries to the other side.
+
+        Returns:
+            Timeline: Send and arrival times, in ms from the start of the
+                entry's script.
+        """
+        send = np.full(len(self), np.nan)
+        transit = latency.transit(self.size.astype(np.float64))
+        arrival = np.full(len(self), np.nan)
+
+        def visit(level: np.ndarray):
+            ready = np.zeros(len(level))
+            dependence = self.dependence[level]
+            has = dependence >= 0
+            deps = dependence[has]
+            crossing = self.origin[deps] != self.origin[level[has]]
+            ready[has] = send[deps] + np.where(crossing, transit[deps], 0.0)
+            previous = self.previous[level]
+            has = previous >= 0
+            ready[has] = np.maximum(ready[has], send[previous[has]])
+            send[level] = ready + self.delay[level]
+            arrival[level] = send[level] + transit[level]
+
+        self._sort([self.dependence, self.previous], visit)
+        return Timeline(send, arrival)
+
+    def durations(self, timeline: Timeline) -> np.ndarray:
+        """Time until the last entry of each script arrived, NaN if one never does."""
+        ends = np.full(self.n_scripts, np.nan)
+        nonempty = np.diff(self.offsets) > 0
+        if len(self):
+            ends[nonempty] = np.maximum.reduceat(timeline.arrival, self.offsets[:-1][nonempty])
+        return ends
@@ -0,0 +1,270 @@
+"""
+  Bulk reading and writing of scripts (lists of ScriptEntry)
+
+  Two formats:
+    * JSON lines, one `ScriptEntry.to_json()` object per line, parsed in
+      chunks of lines with a single `json.loads` each
+    * ScriptColumns, a columnar `.npz` layout: one array per field, enums as
+      codes, and ids, dependences and samples as indices into utf-8 string
+      tables. It round-trips every entry exactly.
+"""
+import gc
+import itertools as it
+import json
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+# MICE
+from .Script import Origin, Protocol, ScriptEntry
+
+PathOrFile = Union[str, IO]
+
+_ORIGINS = list(Origin)
+_PROTOCOLS = list(Protocol)
+# Keyed on both the members and their values, since entries parsed from JSON
+# hold plain strings.
+_ORIGIN_CODES = {key: code for code, origin in enumerate(_ORIGINS) for key in (origin, origin.value)}
+_PROTOCOL_CODES = {
+    key: code for code, protocol in enumerate(_PROTOCOLS) for key in (protocol, protocol.value)
+}
+_FIELDS = ScriptEntry._fields
+
+
+@contextmanager
+def _gc_paused():
+    """Pause the cyclic garbage collector, of the whole process, while
+    building millions of entries, which would otherwise trigger collection
+    after collection."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _open(path: PathOrFile, mode: str):
+    if isinstance(path, (str, bytes)) or hasattr(path, "__fspath__"):
+        return open(path, mode, encoding="utf-8")
+    return _Borrowed(path)
+
+
+class _Borrowed:
+    """Context manager that leaves a caller's file open."""
+
+    def __init__(self, f: IO):
+        self.f = f
+
+    def __enter__(self) -> IO:
+        return self.f
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def iter_jsonl(path: PathOrFile, chunk_size: int = 4096) -> Iterator[ScriptEntry]:
+    """Lazily read the entries of a JSON lines script.
+
+    Entries are parsed like `ScriptEntry.from_json`, `chunk_size` lines at a
+    time. Blank lines are skipped.
+
+    Args:
+        path (PathOrFile): Path to the file, or an open text file.
+        chunk_size (int): Number of lines parsed together.
+
+    Yields:
+        ScriptEntry: The entries in file order.
+    """
+    with _open(path, "r") as f:
+        while True:
+            chunk = list(it.islice(f, chunk_size))
+            if not chunk:
+                return
+            lines = [line for line in chunk if line.strip()]
+            yield from [
+                ScriptEntry(sample=data.pop("sample", None), **data)
+                for data in json.loads("[" + ",".join(lines) + "]")
+            ]
+
+
+def load_jsonl(
+    path: PathOrFile, chunk_size: int = 4096, pause_gc: bool = False
+) -> List[ScriptEntry]:
+    """Every entry of a JSON lines script, see `iter_jsonl`.
+
+    Args:
+        path (PathOrFile): Path to the file, or an open text file.
+        chunk_size (int): Number of lines parsed together.
+        pause_gc (bool): Disable the garbage collector while loading, which
+            speeds up loading millions of entries. It is disabled for the
+            whole process, so other threads allocating meanwhile are affected.
+    """
+    if not pause_gc:
+        return list(iter_jsonl(path, chunk_size))
+    with _gc_paused():
+        return list(iter_jsonl(path, chunk_size))
+
+
+def dump_jsonl(entries: Iterable[ScriptEntry], path: PathOrFile, chunk_size: int = 4096) -> None:
+    """Write entries as JSON lines, `chunk_size` lines per write.
+
+    Args:
+        entries (Iterable[ScriptEntry]): The entries.
+        path (PathOrFile): Path to the file, or an open text file.
+        chunk_size (int): Number of lines written together.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    entries = iter(entries)
+    with _open(path, "w") as f:
+        while True:
+            chunk = list(it.islice(entries, chunk_size))
+            if not chunk:
+                return
+            f.write("".join(encode(dict(zip(_FIELDS, entry))) + "\n" for entry in chunk))
+
+
+def pack_strings(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenated utf-8 bytes of `strings` and the `len(strings) + 1` offsets
+    delimiting each string in them."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """The strings packed by `pack_strings`."""
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    text = data.decode("utf-8")
+    if len(text) == len(data):  # ASCII: byte offsets are character offsets
+        return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+
+class ScriptColumns(NamedTuple):
+    """Columnar form of a script.
+
+    `names` holds the id of every entry, in order, followed by any dependence
+    that is not the id of an entry. `dependence` and `sample` are indices into
+    `names` and `samples`, with -1 for None.
+    """
+
+    names: Tuple[np.ndarray, np.ndarray]  # pack_strings of ids, then other dependences
+    origin: np.ndarray  # uint8 index into Origin
+    size: np.ndarray  # int64
+    entropy: np.ndarray  # float64
+    protocol: np.ndarray  # uint8 index into Protocol
+    flags: np.ndarray  # int64
+    dependence: np.ndarray  # int64 index into names, -1 for None
+    delay: np.ndarray  # int64
+    sample: np.ndarray  # int64 index into samples, -1 for None
+    samples: Tuple[np.ndarray, np.ndarray]  # pack_strings of the distinct samples
+
+    def __len__(self) -> int:
+        return len(self.origin)
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[ScriptEntry]) -> "ScriptColumns":
+        """Columns of `entries`.
+
+        Raises:
+            ValueError: If an origin or protocol is not an Origin or Protocol.
+        """
+        columns = list(zip(*entries)) or [()] * len(_FIELDS)
+        ids, origins, sizes, entropies, protocols, flags, dependences, delays, samples = columns
+
+        names = list(ids)
+        name_index = {}
+        for idx, name in enumerate(names):
+            name_index.setdefault(name, idx)
+        for name in dependences:
+            if name is not None and name not in name_index:
+                name_index[name] = len(names)
+                names.append(name)
+        name_index[None] = -1
+        dependence = np.array([name_index[name] for name in dependences], dtype=np.int64)
+
+        sample_index = {}
+        sample = np.array(
+            [-1 if s is None else sample_index.setdefault(s, len(sample_index)) for s in samples],
+            dtype=np.int64,
+        )
+
+        try:
+            origin = np.array([_ORIGIN_CODES[o] for o in origins], dtype=np.uint8)
+            protocol = np.array([_PROTOCOL_CODES[p] for p in protocols], dtype=np.uint8)
+        except KeyError as e:
+            raise ValueError(f"Cannot encode script: unknown origin or protocol {e}") from e
+
+        return cls(
+            pack_strings(names),
+            origin,
+            np.array(sizes, dtype=np.int64),
+            np.array(entropies, dtype=np.float64),
+            protocol,
+            np.array(flags, dtype=np.int64),
+            dependence,
+            np.array(delays, dtype=np.int64),
+            sample,
+            pack_strings(list(sample_index)),
+        )
+
+    def to_entries(self) -> List[ScriptEntry]:
+        names = unpack_strings(*self.names)
+        samples = unpack_strings(*self.samples)
+        ids = names[: len(self)]
+        names.append(None)  # dependence -1
+        samples.append(None)  # sample -1
+        return [
+            ScriptEntry(*fields)
+            for fields in zip(
+                ids,
+                [_ORIGINS[code] for code in self.origin.tolist()],
+                self.size.tolist(),
+                self.entropy.tolist(),
+                [_PROTOCOLS[code] for code in self.protocol.tolist()],
+                self.flags.tolist(),
+                [names[idx] for idx in self.dependence.tolist()],
+                self.delay.tolist(),
+                [samples[idx] for idx in self.sample.tolist()],
+            )
+        ]
+
+    def save(self, path: Union[str, IO], compress: bool = False) -> None:
+        """Write the columns to a `.npz` file, see `load`."""
+        arrays = {
+            field: value for field, value in self._asdict().items() if field not in ("names", "samples")
+        }
+        arrays["names"], arrays["name_offsets"] = self.names
+        arrays["samples"], arrays["sample_offsets"] = self.samples
+        save = np.savez_compressed if compress else np.savez
+        # Through an open file, so no `.npz` suffix is appended to `path`.
+        if isinstance(path, (str, bytes)) or hasattr(path, "__fspath__"):
+            with open(path, "wb") as f:
+                save(f, **arrays)
+        else:
+            save(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, IO]) -> "ScriptColumns":
+        with np.load(path) as arrays:
+            fields = {
+                field: arrays[field] for field in cls._fields if field not in ("names", "samples")
+            }
+            fields["names"] = (arrays["names"], arrays["name_offsets"])
+            fields["samples"] = (arrays["samples"], arrays["sample_offsets"])
+        return cls(**fields)
+
+
+def save_script(entries: Sequence[ScriptEntry], path: Union[str, IO], compress: bool = False) -> None:
+    """Write a script in the ScriptColumns format."""
+    ScriptColumns.from_entries(entries).save(path, compress)
+
+
+def load_script(path: Union[str, IO]) -> List[ScriptEntry]:
+    """Read a script written by `save_script`."""
+    return ScriptColumns.load(path).to_entries()
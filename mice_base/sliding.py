@@ -0,0 +1,430 @@
+"""
+  Incremental feature extraction over sliding windows of a flow
+
+  Consecutive windows of a flow share `win_size - stride` packets. A
+  SlidingWindowExtractor decodes the flow into a PacketTable once and, as the
+  window advances, only adds the packets entering it to (and removes those
+  leaving it from) running summary statistics, histogram counts and byte
+  totals. Features without an incremental form are computed per window,
+  batched, from the same table.
+"""
+import math
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# MICE
+from .fe_types import FlowID, PacketTable, Pkts, Window
+from .extract import column_slices
+from .planner import FeaturePlan, FeatureType
+from .BaseFeatures.packet_table import build_packet_table
+from .DerivedFeatures.DirSignBurstBytes import DirSignBurstBytes
+from .DerivedFeatures.DirSignSizes import DirSignSizes
+from .DerivedFeatures.TotalBwdBytes import TotalBwdBytes
+from .DerivedFeatures.TotalFwdBytes import TotalFwdBytes
+from .DerivedFeatures.hist import bucket_index
+from .DerivedFeatures.summary import STATS
+
+Bounds = Tuple[int, int]
+
+
+def window_bounds(
+    n_pkts: int, win_size: int, stride: Optional[int] = None, emit_partial: bool = True
+) -> List[Bounds]:
+    """`(start, end)` of every window of a flow of `n_pkts` packets.
+
+    The windows are those `pcap_stream.iter_windows` cuts from the flow:
+    window `k` covers packets `k * stride` to `k * stride + win_size`, and
+    with `emit_partial` a shorter window holds the packets no full window
+    covered.
+    """
+    stride = win_size if stride is None else stride
+    bounds = [(start, start + win_size) for start in range(0, n_pkts - win_size + 1, stride)]
+    start = bounds[-1][0] + stride if bounds else 0
+    covered = bounds[-1][1] if bounds else 0
+    if emit_partial and n_pkts > max(start, covered):
+        bounds.append((start, n_pkts))
+    return bounds
+
+
+def _packet_values(table: PacketTable, feature: FeatureType) -> Optional[np.ndarray]:
+    """Values of every packet of the flow, for features whose values for a full
+    window are just those of the packets in it."""
+    per_packet = getattr(feature, "per_packet", None)
+    if per_packet is not None and per_packet.column is not None:
+        return getattr(table, per_packet.column).astype(np.float64)
+    if feature is DirSignSizes:
+        return (table.direction * table.size).astype(np.float64)
+    return None
+
+
+def _xlog2x(count: int) -> float:
+    return count * math.log2(count) if count else 0.0
+
+
+class _RunningStats:
+    """Every statistic in STATS of the values of the packets in the window.
+
+    Mean and variance are updated with Welford's algorithm, max and min are
+    the fronts of monotonic deques, and entropy is kept as the sum of
+    `c * log2(c)` over the counts `c` of distinct values.
+    """
+
+    def __init__(self, values: Sequence[float]):
+        self.values = values
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.maxima: deque = deque()
+        self.minima: deque = deque()
+        self.counts: Counter = Counter()
+        self.count_bits = 0.0
+
+    def add(self, idx: int) -> None:
+        val = self.values[idx]
+        self.n += 1
+        self.total += val
+        delta = val - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (val - self.mean)
+
+        while self.maxima and self.values[self.maxima[-1]] <= val:
+            self.maxima.pop()
+        self.maxima.append(idx)
+        while self.minima and self.values[self.minima[-1]] >= val:
+            self.minima.pop()
+        self.minima.append(idx)
+
+        count = self.counts[val]
+        self.count_bits += _xlog2x(count + 1) - _xlog2x(count)
+        self.counts[val] = count + 1
+
+    def remove(self, idx: int) -> None:
+        """Remove the oldest packet of the window, `idx`."""
+        val = self.values[idx]
+        self.n -= 1
+        self.total -= val
+        if self.n:
+            delta = val - self.mean
+            self.mean -= delta / self.n
+            self.m2 -= delta * (val - self.mean)
+        else:
+            self.total = self.mean = self.m2 = 0.0
+
+        if self.maxima[0] == idx:
+            self.maxima.popleft()
+        if self.minima[0] == idx:
+            self.minima.popleft()
+
+        count = self.counts[val]
+        self.count_bits += _xlog2x(count - 1) - _xlog2x(count)
+        if count == 1:
+            del self.counts[val]
+        else:
+            self.counts[val] = count - 1
+
+    def stats(self) -> List[float]:
+        n = self.n
+        variance = max(self.m2, 0.0) / (n - 1) if n > 1 else 0.0
+        return [
+            self.values[self.maxima[0]],
+            self.values[self.minima[0]],
+            self.total,
+            self.total / n,
+            math.sqrt(variance),
+            variance,
+            max(math.log2(n) - self.count_bits / n, 0.0),
+        ]
+
+
+class _BucketCounts:
+    """Histogram of the values of the packets in the window."""
+
+    def __init__(self, buckets: np.ndarray, n_buckets: int):
+        self.buckets = buckets.tolist()
+        self.counts = np.zeros(n_buckets)
+
+    def add(self, idx: int) -> None:
+        self.counts[self.buckets[idx]] += 1
+
+    def remove(self, idx: int) -> None:
+        self.counts[self.buckets[idx]] -= 1
+
+
+class _DirectedTotals:
+    """Forward and backward bytes of the packets in the window."""
+
+    def __init__(self, dir_sign_sizes: Sequence[float]):
+        self.dir_sign_sizes = dir_sign_sizes
+        self.fwd = 0.0
+        self.bwd = 0.0
+
+    def add(self, idx: int) -> None:
+        val = self.dir_sign_sizes[idx]
+        if val > 0:
+            self.fwd += val
+        elif val < 0:
+            self.bwd -= val
+
+    def remove(self, idx: int) -> None:
+        val = self.dir_sign_sizes[idx]
+        if val > 0:
+            self.fwd -= val
+        elif val < 0:
+            self.bwd += val
+
+
+class _Runs:
+    """Runs of same-direction packets in the window, and their bursts.
+
+    The bursts of a window are its runs, the first one cut at the window
+    start. Like DirSignBurstBytes, the run still open at the end of the
+    window and runs of direction 0 are not bursts. Each run is updated when
+    a packet enters or leaves the window, and burst bytes are kept in order
+    in a buffer of `2 * win_size` values, so `burst_bytes` returns a view of
+    the window's bursts without scanning or allocating.
+    """
+
+    def __init__(self, directions: Sequence[float], sizes: Sequence[float], win_size: int):
+        self.directions = directions
+        self.sizes = sizes
+        self.win_size = win_size
+        self.runs: deque = deque()  # [direction, bytes, packets], the last one open
+        self.buffer = np.zeros(2 * win_size)
+        self.head = 0  # burst of the first run, if it is one
+        self.tail = 0  # where the open run goes once it is a burst
+
+    def add(self, idx: int) -> None:
+        direction, size = self.directions[idx], self.sizes[idx]
+        if self.runs and self.runs[-1][0] == direction:
+            self.runs[-1][1] += size
+            self.runs[-1][2] += 1
+            return
+        if self.runs and self.runs[-1][0]:
+            self.buffer[self.tail] = self.runs[-1][0] * self.runs[-1][1] + 0.0
+            self.tail += 1
+        self.runs.append([direction, size, 1])
+
+    def remove(self, idx: int) -> None:
+        """Remove the oldest packet of the window, `idx`."""
+        first = self.runs[0]
+        first[1] -= self.sizes[idx]
+        first[2] -= 1
+        burst = first[0] and len(self.runs) > 1
+        if burst:
+            self.buffer[self.head] = first[0] * first[1] + 0.0
+        if not first[2]:
+            self.runs.popleft()
+            if burst:
+                self.head += 1
+        # A window has fewer than win_size bursts, so the tail stays in the
+        # buffer as long as the head is in its first half.
+        if self.head > self.win_size:
+            kept = self.tail - self.head
+            self.buffer[:kept] = self.buffer[self.head : self.tail]
+            self.buffer[kept:] = 0.0
+            self.head, self.tail = 0, kept
+
+    def burst_bytes(self) -> np.ndarray:
+        return self.buffer[self.head : self.head + self.win_size]
+
+
+class SlidingWindowExtractor:
+    """Computes features for every window of a flow, sharing work across windows.
+
+    Updated incrementally as the window slides, for full windows:
+        * `summary` statistics (max/min/sum/mean/stdev/variance/entropy) and
+          `hist` counts of windowized features and DirSignSizes
+        * TotalFwdBytes and TotalBwdBytes
+        * DirSignBurstBytes, from the runs of packets in the window
+    Windowized features are read straight from the flow's PacketTable. All
+    other features, and every feature of a partial window, are evaluated by a
+    FeaturePlan with the same results as their `get_value`.
+
+    Usage:
+        ```
+        extractor = SlidingWindowExtractor([MaxSizes, HistSizes], win_size=100, stride=1)
+        matrix = extractor.extract(fid, pkts)  # one row per extractor.bounds(len(pkts))
+        ```
+
+    Args:
+        features (Sequence[FeatureType]): The features, in column order.
+        win_size (int): Number of packets per window.
+        stride (Optional[int]): Packets between window starts. Defaults to
+            `win_size`.
+        emit_partial (bool): See `window_bounds`.
+        batch_size (int): Number of windows evaluated together by the
+            FeaturePlan.
+    """
+
+    def __init__(
+        self,
+        features: Sequence[FeatureType],
+        win_size: int,
+        stride: Optional[int] = None,
+        emit_partial: bool = True,
+        batch_size: int = 1024,
+    ):
+        self.plan = FeaturePlan(features)
+        self.win_size = win_size
+        self.stride = win_size if stride is None else stride
+        self.emit_partial = emit_partial
+        self.batch_size = batch_size
+        self.names = self.plan.get_names(win_size)
+
+        # (feature, columns) in column order; a feature may be requested twice.
+        self._columns = list(zip(self.plan.features, column_slices(self.plan, win_size)))
+
+    def get_names(self) -> List[str]:
+        return self.names
+
+    def bounds(self, n_pkts: int) -> List[Bounds]:
+        return window_bounds(n_pkts, self.win_size, self.stride, self.emit_partial)
+
+    def extract(
+        self,
+        fid: Optional[FlowID],
+        pkts: Union[Pkts, PacketTable],
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Features of every window of the flow `pkts`.
+
+        Args:
+            fid (Optional[FlowID]): The flow.
+            pkts (Union[Pkts, PacketTable]): Every packet of the flow.
+            out (Optional[np.ndarray]): A `(len(bounds), n_columns)` array to
+                write into instead of allocating one.
+
+        Returns:
+            np.ndarray: One row per window of `self.bounds(len(pkts))`.
+        """
+        table = pkts if isinstance(pkts, PacketTable) else build_packet_table(fid, pkts)
+        bounds = self.bounds(len(table))
+        if out is None:
+            out = np.zeros((len(bounds), len(self.names)))
+        elif out.shape != (len(bounds), len(self.names)):
+            raise ValueError(f"out has shape {out.shape}, expected {(len(bounds), len(self.names))}")
+
+        full = [bound for bound in bounds if bound[1] - bound[0] == self.win_size]
+        packets, readers, states = self._incremental(table)
+        rest = FeaturePlan([feature for feature in self.plan.features if feature not in readers])
+        for feature in rest.order:
+            if feature not in packets:
+                values = _packet_values(table, feature)
+                if values is not None:
+                    packets[feature] = values
+
+        if full:
+            # Views of every full window's values, without copying them.
+            windows = {
+                feature: sliding_window_view(values, self.win_size)[:: self.stride][: len(full)]
+                for feature, values in packets.items()
+            }
+            if readers:
+                self._slide(full, states, readers, out)
+            if rest.features:
+                self._evaluate(fid, table, full, 0, rest, windows, out)
+
+        # Only the last window can be partial; it is padded like any window.
+        self._evaluate(fid, table, bounds[len(full) :], len(full), self.plan, {}, out)
+        return out
+
+    def _incremental(self, table: PacketTable):
+        """Per-packet values of windowized features, readers of the values of
+        incremental features, and the states the readers share."""
+        packets: Dict[FeatureType, np.ndarray] = {}
+        readers: Dict[FeatureType, Callable[[int, int], Sequence[float]]] = {}
+        states: Dict[object, object] = {}
+
+        def packet_values(feature) -> Optional[np.ndarray]:
+            if feature not in packets:
+                values = _packet_values(table, feature)
+                if values is None:
+                    return None
+                packets[feature] = values
+            return packets[feature]
+
+        def state(key, factory):
+            if key not in states:
+                states[key] = factory()
+            return states[key]
+
+        for feature in self.plan.features:
+            source = getattr(feature, "source", None)
+            statistic = getattr(feature, "statistic", None)
+            bins = getattr(feature, "bins", None)
+
+            if statistic is not None and packet_values(source) is not None:
+                stats = state(("stats", source), lambda: _RunningStats(packets[source].tolist()))
+                column = STATS.index(statistic)
+                readers[feature] = lambda start, end, stats=stats, column=column: [
+                    stats.stats()[column]
+                ]
+            elif bins is not None and packet_values(source) is not None:
+                counts = state(
+                    ("hist", feature),
+                    lambda: _BucketCounts(bucket_index(packets[source], bins), len(bins)),
+                )
+                readers[feature] = lambda start, end, counts=counts: counts.counts
+            elif feature is TotalFwdBytes or feature is TotalBwdBytes:
+                packet_values(DirSignSizes)
+                totals = state("totals", lambda: _DirectedTotals(packets[DirSignSizes].tolist()))
+                attribute = "fwd" if feature is TotalFwdBytes else "bwd"
+                readers[feature] = lambda start, end, totals=totals, attribute=attribute: [
+                    getattr(totals, attribute)
+                ]
+            elif feature is DirSignBurstBytes:
+                runs = state(
+                    "runs",
+                    lambda: _Runs(
+                        table.direction.astype(np.float64).tolist(),
+                        table.size.astype(np.float64).tolist(),
+                        self.win_size,
+                    ),
+                )
+                readers[feature] = lambda start, end, runs=runs: runs.burst_bytes()
+
+        return packets, readers, list(states.values())
+
+    def _slide(self, full: List[Bounds], states: List, readers: Dict, out: np.ndarray) -> None:
+        reads = [(columns, readers[feature]) for feature, columns in self._columns if feature in readers]
+        prev_start = prev_end = 0
+        for row, (start, end) in enumerate(full):
+            for state in states:
+                for idx in range(prev_start, min(prev_end, start)):
+                    state.remove(idx)
+                for idx in range(max(prev_end, start), end):
+                    state.add(idx)
+            for columns, read in reads:
+                out[row, columns] = read(start, end)
+            prev_start, prev_end = start, end
+
+    def _evaluate(
+        self,
+        fid: Optional[FlowID],
+        table: PacketTable,
+        bounds: List[Bounds],
+        first_row: int,
+        plan: FeaturePlan,
+        known: Dict[FeatureType, np.ndarray],
+        out: np.ndarray,
+    ) -> None:
+        requested = set(plan.features)
+        for offset in range(0, len(bounds), self.batch_size):
+            batch = bounds[offset : offset + self.batch_size]
+            windows = [
+                Window(f"{table.name}_{start}", start, end, fid, table.slice(start, end))
+                for start, end in batch
+            ]
+            values = plan.evaluate_batch(
+                windows,
+                self.win_size,
+                {feature: array[offset : offset + len(batch)] for feature, array in known.items()},
+            )
+            rows = slice(first_row + offset, first_row + offset + len(batch))
+            for feature, columns in self._columns:
+                if feature in requested:
+                    out[rows, columns] = values[feature]
@@ -0,0 +1,69 @@
+import numpy as np
+from scapy.layers.inet import ICMP, IP, TCP, UDP
+from scapy.layers.l2 import Ether
+
+import mice_base as mb
+from mice_base.fe_types import FlowID, Proto, Pkts, RawPkt
+from mice_base.online import ONLINE_FEATURES, FlowFeatureState
+from mice_base.sliding import SlidingWindowExtractor
+from mice_base.BaseFeatures.Sizes import Sizes
+from mice_base.BaseFeatures.packet_table import build_packet_table
+
+FID = FlowID("10.0.0.1", "10.0.0.2", 40000, 80, Proto.TCP)
+WIN_SIZE = 6
+FEATURES = list(ONLINE_FEATURES) + [mb.summary(Sizes, max), mb.hist(Sizes, [0, 2, 10, 1500])]
+
+
+def _packets():
+    client, server = ("10.0.0.1", "10.0.0.2")
+    pkts = [
+        IP(src=client, dst=server) / TCP(sport=40000, dport=80) / b"abc",
+        IP(src=server, dst=client) / ICMP() / b"ping",
+        IP(src=server, dst=client) / TCP(sport=80, dport=40000) / b"hello",
+        IP(src=client, dst=server) / ICMP(),
+        IP(src=client, dst=server) / TCP(sport=40000, dport=80) / (b"x" * 20),
+    ]
+    pkts = [Ether(bytes(Ether() / pkt)) for pkt in pkts]
+    for idx, pkt in enumerate(pkts):
+        pkt.time = 1.0 + 0.5 * idx
+    return pkts
+
+
+def _row(values):
+    return np.array([value for feature in FEATURES for value in values(feature)], dtype=np.float64)
+
+
+def _backends(pkts):
+    window = Pkts("flow", pkts)
+    table = build_packet_table(FID, window)
+    state = FlowFeatureState(FID, WIN_SIZE, FEATURES)
+    for pkt in pkts:
+        state.push(pkt)
+    sliding = SlidingWindowExtractor(FEATURES, WIN_SIZE).extract(FID, window)
+    return {
+        "pkts": _row(lambda f: f.get_value(FID, window, WIN_SIZE)),
+        "table": _row(lambda f: f.get_value(FID, table, WIN_SIZE)),
+        "online": np.array(state.snapshot(), dtype=np.float64),
+        "sliding": sliding[0],
+    }
+
+
+def test_icmp_window_agrees_across_backends():
+    rows = _backends(_packets())
+    reference = rows.pop("pkts")
+    for name, row in rows.items():
+        np.testing.assert_array_equal(row, reference, err_msg=name)
+
+
+def test_icmp_window_agrees_across_backends_raw():
+    pkts = [RawPkt(float(pkt.time), bytes(pkt), 1) for pkt in _packets()]
+    rows = _backends(pkts)
+    reference = rows.pop("pkts")
+    for name, row in rows.items():
+        np.testing.assert_array_equal(row, reference, err_msg=name)
+
+
+def test_icmp_size_is_zero():
+    window = Pkts("flow", _packets())
+    assert Sizes.get_value(FID, window, WIN_SIZE)[1] == 0
+    assert Sizes.get_value(FID, window, WIN_SIZE)[3] == 0
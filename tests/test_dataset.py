@@ -0,0 +1,13 @@
+import os
+
+import numpy as np
+
+from mice_base.dataset import FeatureDataset
+
+
+def test_overwrite_removes_every_old_column(tmp_path):
+    root = str(tmp_path / "ds")
+    FeatureDataset.write(root, np.ones((5, 4)), ["a", "b", "c", "d"])
+    dataset = FeatureDataset.write(root, np.zeros((2, 2)), ["x", "y"])
+    assert sorted(os.listdir(root)) == ["00000.bin", "00001.bin", "meta.json"]
+    np.testing.assert_array_equal(dataset.read(), np.zeros((2, 2)))
@@ -0,0 +1,54 @@
+from scapy.layers.inet import IP, TCP
+from scapy.layers.l2 import Ether
+
+from mice_base.flow_table import FlowTable
+
+CLIENT = ("10.0.0.1", 40000)
+SERVER = ("10.0.0.2", 80)
+
+
+def _pkt(time, sender, receiver, flags):
+    pkt = Ether() / IP(src=sender[0], dst=receiver[0]) / TCP(
+        sport=sender[1], dport=receiver[1], flags=flags
+    )
+    pkt.time = time
+    return pkt
+
+
+def _teardown():
+    return [
+        _pkt(0.0, CLIENT, SERVER, "S"),
+        _pkt(0.1, SERVER, CLIENT, "SA"),
+        _pkt(0.2, CLIENT, SERVER, "A"),
+        _pkt(0.3, CLIENT, SERVER, "FA"),
+        _pkt(0.4, SERVER, CLIENT, "FA"),
+        _pkt(0.5, CLIENT, SERVER, "A"),
+    ]
+
+
+def test_fin_teardown_is_one_flow():
+    table = FlowTable()
+    flows = [flow for pkt in _teardown() for flow in table.push(pkt)]
+    assert len(flows) == 1
+    fid, pkts = flows[0]
+    assert (fid.sip, fid.sport) == CLIENT
+    assert len(pkts) == 6
+    assert table.live_flows == 0
+    assert table.evictions["fin"] == 1
+
+
+def test_fin_teardown_without_last_ack_lingers():
+    table = FlowTable(fin_linger=1.0)
+    flows = [flow for pkt in _teardown()[:-1] for flow in table.push(pkt)]
+    assert flows == []
+    flows = table.push(_pkt(5.0, ("10.0.0.3", 1), ("10.0.0.4", 2), "S"))
+    assert len(flows) == 1 and len(flows[0][1]) == 5
+    assert table.live_flows == 1
+
+
+def test_rst_evicts_immediately():
+    table = FlowTable()
+    flows = [flow for pkt in _teardown()[:3] for flow in table.push(pkt)]
+    flows += table.push(_pkt(0.3, SERVER, CLIENT, "R"))
+    assert len(flows) == 1 and len(flows[0][1]) == 4
+    assert table.live_flows == 0
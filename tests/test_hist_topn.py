@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pytest
+
+from mice_base.DerivedFeatures.hist import bucket_counts
+from mice_base.DerivedFeatures.topN import top_n
+
+BUCKETS = [0, 5, 10, 1440]
+
+
+def _python_hist(values, buckets):
+    """The per-window implementation `bucket_counts` replaced."""
+    results = [0.0] * len(buckets)
+    keys = list(buckets) + [math.inf]
+    cur_idx = 0
+    upper_idx = keys[cur_idx + 1]
+    for val in sorted(values):
+        while val > upper_idx and cur_idx < len(keys) - 2:
+            cur_idx += 1
+            upper_idx = keys[cur_idx + 1]
+        results[cur_idx] += 1
+    return results
+
+
+def _python_top_n(values, n, bottom):
+    """The per-window implementation `top_n` replaced."""
+    data = sorted(float(v) for v in values)
+    data = data[:n] if bottom else data[-n:]
+    return data + [0.0] * (n - len(data))
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        [0, 5, 10, 1440],  # on every boundary
+        [-1, 0, 0.5, 4.999, 5.001],  # below the first bucket, around the second boundary
+        [1440, 1441, math.inf, 9.5, 10],  # on and above the last boundary
+        [5, 5, 5, 10, 10],  # ties on boundaries
+        [-math.inf, 3, 3, 3, 2000],
+    ],
+)
+def test_hist_matches_python(row):
+    assert bucket_counts([row], BUCKETS)[0].tolist() == _python_hist(row, BUCKETS)
+
+
+def test_hist_single_bucket_and_empty_window():
+    assert bucket_counts([[-3, 0, 7]], [3])[0].tolist() == _python_hist([-3, 0, 7], [3])
+    assert bucket_counts(np.zeros((2, 0)), BUCKETS).tolist() == [[0.0] * 4] * 2
+
+
+def test_hist_random_windows_match_python():
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [rng.choice(BUCKETS, (50, 8)), rng.integers(-5, 1500, (50, 8))]
+    ).astype(np.float64)
+    counts = bucket_counts(values, BUCKETS)
+    for row, expected in zip(values.tolist(), counts.tolist()):
+        assert expected == _python_hist(row, BUCKETS)
+
+
+@pytest.mark.parametrize("bottom", [False, True])
+@pytest.mark.parametrize("n", [1, 3, 5, 8])
+@pytest.mark.parametrize(
+    "row",
+    [
+        [4, 4, 4, 4, 4],  # all tied
+        [1, 9, 9, 2, 9, 1],  # ties at the cut
+        [-2.5, 0, 0, 7, -2.5],
+        [math.inf, -math.inf, 3, 3],
+    ],
+)
+def test_top_n_matches_python(row, n, bottom):
+    assert top_n([row], n, bottom)[0].tolist() == _python_top_n(row, n, bottom)
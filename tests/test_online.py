@@ -0,0 +1,45 @@
+import numpy as np
+from scapy.layers.inet import ICMP, IP, TCP
+from scapy.layers.l2 import Ether
+
+from mice_base.fe_types import FlowID, Proto, Pkts, RawPkt
+from mice_base.online import ONLINE_FEATURES, FlowFeatureState
+from mice_base.planner import FeaturePlan
+from mice_base.BaseFeatures.packet_table import build_packet_table
+
+FID = FlowID("10.0.0.1", "10.0.0.2", 40000, 80, Proto.TCP)
+
+
+def _packets():
+    pkts = [
+        Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=40000, dport=80) / b"abc",
+        Ether() / IP(src="10.0.0.2", dst="10.0.0.1") / ICMP(),
+        Ether() / IP(src="10.0.0.2", dst="10.0.0.1") / TCP(sport=80, dport=40000) / b"hello",
+    ]
+    pkts = [Ether(bytes(pkt)) for pkt in pkts]
+    for idx, pkt in enumerate(pkts):
+        pkt.time = 1.0 + idx
+    return pkts
+
+
+def _check(pkts, win_size=4):
+    state = FlowFeatureState(FID, win_size)
+    for pkt in pkts:
+        state.push(pkt)
+    table = build_packet_table(FID, Pkts("flow", pkts))
+    plan = FeaturePlan(ONLINE_FEATURES)
+    values = plan.evaluate(FID, table, win_size)
+    expected = [value for feature in plan.features for value in values[feature]]
+    np.testing.assert_allclose(state.snapshot(), expected, equal_nan=True)
+    return state
+
+
+def test_ip_packet_without_tcp_or_udp_has_size_zero():
+    state = _check(_packets())
+    assert state.sizes[1] == 0
+
+
+def test_raw_ip_packet_without_tcp_or_udp_has_size_zero():
+    pkts = [RawPkt(float(pkt.time), bytes(pkt), 1) for pkt in _packets()]
+    state = _check(pkts)
+    assert state.sizes[1] == 0
@@ -0,0 +1,24 @@
+import numpy as np
+
+from mice_base.BaseFeatures.Entropies import Entropy, counts_entropy
+from mice_base.payload import RESOLUTION, payload_histogram, synthesize_payload
+
+
+def test_histogram_meets_entropy_across_lengths():
+    for length in (300, 500, 1000, 1500):
+        for entropy in np.linspace(0.5, 7.5, 71):
+            counts = payload_histogram(length, entropy)
+            assert counts.sum() == length
+            assert abs(counts_entropy(counts) - entropy) <= RESOLUTION, (length, entropy)
+
+
+def test_low_entropy_target():
+    # Far from the dominant byte plus evenly spread bytes of the table.
+    counts = payload_histogram(500, 0.3)
+    assert abs(counts_entropy(counts) - 0.3) <= RESOLUTION / 2
+
+
+def test_payload_bytes_have_histogram_entropy():
+    payload = synthesize_payload(700, 3.21)
+    assert len(payload) == 700
+    assert abs(Entropy.entropy(payload) - 3.21) <= RESOLUTION
@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+from mice_base.pcap_stream import iter_packets
+
+FRAME = bytes(range(14))
+
+
+def _block(block_type, body):
+    body += b"\0" * (-len(body) % 4)
+    length = 12 + len(body)
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+def _shb():
+    return _block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1))
+
+
+def _idb():
+    return _block(1, struct.pack("<HHI", 1, 0, 65535))
+
+
+def _epb(iface=0, caplen=len(FRAME), data=FRAME):
+    return _block(6, struct.pack("<IIIII", iface, 0, 1_000_000, caplen, len(FRAME)) + data)
+
+
+def _spb(data=FRAME):
+    return _block(3, struct.pack("<I", len(data)) + data)
+
+
+def _read(tmp_path, contents):
+    path = tmp_path / "capture.pcapng"
+    path.write_bytes(contents)
+    return list(iter_packets(str(path)))
+
+
+def test_pcapng_packets(tmp_path):
+    pkts = _read(tmp_path, _shb() + _idb() + _epb() + _spb())
+    assert [pkt.data for pkt in pkts] == [FRAME, FRAME]
+    assert pkts[0].time == 1.0
+    assert all(pkt.linktype == 1 for pkt in pkts)
+
+
+@pytest.mark.parametrize(
+    "blocks, message",
+    [
+        ([_spb()], "interface 0"),
+        ([_idb(), _epb(iface=1)], "interface 1"),
+        ([_idb(), _epb(caplen=1000)], "1000 captured bytes"),
+        ([_idb(), _block(6, b"\0" * 8)], "too short"),
+    ],
+)
+def test_malformed_pcapng_names_the_block(tmp_path, blocks, message):
+    contents = _shb() + b"".join(blocks)
+    offset = len(contents) - len(blocks[-1])
+    with pytest.raises(ValueError, match=message) as error:
+        _read(tmp_path, contents)
+    assert f"offset {offset}" in str(error.value)
+
+
+def test_truncated_pcapng_ends(tmp_path):
+    contents = _shb() + _idb() + _epb() + _epb()
+    assert len(_read(tmp_path, contents[:-10])) == 1
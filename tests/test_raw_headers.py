@@ -0,0 +1,82 @@
+import pytest
+from scapy.layers.inet import ICMP, IP, TCP, UDP, IPOption_RR, TCPerror, IPerror
+from scapy.layers.inet6 import IPv6, IPv6ExtHdrFragment, IPv6ExtHdrHopByHop
+from scapy.layers.l2 import ARP, Dot1AD, Dot1Q, Ether
+from scapy.packet import Padding, Raw
+
+from mice_base.BaseFeatures.Directions import Direction
+from mice_base.BaseFeatures.Entropies import Entropy
+from mice_base.BaseFeatures.Sizes import Size
+from mice_base.BaseFeatures.raw_headers import parse_frame
+from mice_base.fe_types import FlowID, Proto, RawPkt
+
+FID = FlowID("10.0.0.1", "10.0.0.2", 40000, 80, Proto.TCP)
+CLIENT = IP(src="10.0.0.1", dst="10.0.0.2")
+SERVER = IP(src="10.0.0.2", dst="10.0.0.1")
+PAYLOAD = Raw(bytes(range(7, 90, 3)))
+
+FRAMES = {
+    "tcp": Ether() / CLIENT / TCP(sport=40000, dport=80) / PAYLOAD,
+    "tcp reply": Ether() / SERVER / TCP(sport=80, dport=40000, flags="PA") / PAYLOAD,
+    "tcp options": Ether() / CLIENT / TCP(sport=40000, dport=80, options=[("MSS", 1460)]) / PAYLOAD,
+    "tcp no payload": Ether() / CLIENT / TCP(sport=40000, dport=80, flags="S"),
+    "udp": Ether() / CLIENT / UDP(sport=40000, dport=80) / PAYLOAD,
+    "ip options": Ether() / IP(src="10.0.0.1", dst="10.0.0.2", options=[IPOption_RR()])
+    / TCP(sport=40000, dport=80)
+    / PAYLOAD,
+    "vlan": Ether() / Dot1Q() / CLIENT / TCP(sport=40000, dport=80) / PAYLOAD,
+    "qinq": Ether() / Dot1AD() / Dot1Q() / SERVER / UDP(sport=80, dport=40000) / PAYLOAD,
+    "ethernet padding": Ether() / CLIENT / TCP(sport=40000, dport=80) / Raw(b"x") / Padding(b"\0" * 10),
+    "fragment": Ether() / IP(src="10.0.0.1", dst="10.0.0.2", frag=3) / TCP(sport=40000, dport=80) / PAYLOAD,
+    "icmp": Ether() / CLIENT / ICMP() / PAYLOAD,
+    "icmp error": Ether() / SERVER / ICMP(type=3) / IPerror() / TCPerror() / PAYLOAD,
+    "ip in ip": Ether() / IP(src="9.9.9.9", dst="8.8.8.8") / CLIENT / TCP(sport=40000, dport=80) / PAYLOAD,
+    "ip in ipv6": Ether() / IPv6() / CLIENT / UDP(sport=40000, dport=80) / PAYLOAD,
+    "ipv6": Ether() / IPv6() / TCP(sport=40000, dport=80) / PAYLOAD,
+    "ipv6 extension headers": Ether() / IPv6() / IPv6ExtHdrHopByHop() / UDP() / PAYLOAD,
+    "ipv6 fragment": Ether() / IPv6() / IPv6ExtHdrFragment(offset=5) / TCP() / PAYLOAD,
+    "arp": Ether() / ARP(),
+}
+
+
+@pytest.fixture(params=sorted(FRAMES), ids=sorted(FRAMES))
+def frame(request):
+    data = bytes(FRAMES[request.param])
+    return Ether(data), data
+
+
+def test_fields_match_scapy(frame):
+    pkt, data = frame
+    headers = parse_frame(data)
+    ip = pkt.getlayer(IP)
+    assert headers.ip_src == (ip.src if ip else None)
+    assert headers.ip_dst == (ip.dst if ip else None)
+    assert headers.ip_len == (ip.len if ip else 0)
+    l4 = pkt.getlayer(TCP) or pkt.getlayer(UDP)
+    if isinstance(l4, TCP):
+        assert headers.proto == Proto.TCP
+        assert (headers.tcp_dataofs, headers.tcp_flags) == (l4.dataofs, int(l4.flags))
+    elif isinstance(l4, UDP):
+        assert headers.proto == Proto.UDP
+        assert headers.udp_len == l4.len
+    else:
+        assert headers.proto == Proto.OTHER
+    if l4 is not None and headers.proto != Proto.OTHER:
+        assert (headers.sport, headers.dport) == (l4.sport, l4.dport)
+        assert bytes(headers.l4) == bytes(l4.original)
+
+
+def test_features_match_scapy(frame):
+    pkt, data = frame
+    raw = RawPkt(1.0, data)
+    for feature in (Size, Direction, Entropy):
+        assert feature.get_value(FID, raw) == feature.get_value(FID, pkt), feature.__name__
+
+
+def test_truncated_frames_match_scapy():
+    data = bytes(FRAMES["tcp options"])
+    # scapy cannot dissect less than an Ethernet header.
+    for length in range(14, len(data)):
+        pkt, raw = Ether(data[:length]), RawPkt(1.0, data[:length])
+        for feature in (Size, Direction, Entropy):
+            assert feature.get_value(FID, raw) == feature.get_value(FID, pkt), (feature.__name__, length)
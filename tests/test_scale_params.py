@@ -0,0 +1,38 @@
+import io
+
+import numpy as np
+
+from mice_base.ScaleParams import ScaleParams
+
+
+def _params():
+    return ScaleParams(np.array([1.0, 2.0]), np.array([0.5, 4.0]), 1e-8)
+
+
+def _assert_equal(loaded, params):
+    np.testing.assert_array_equal(loaded.mu, params.mu)
+    np.testing.assert_array_equal(loaded.std, params.std)
+    assert loaded.eps == params.eps
+
+
+def test_save_load_round_trip_without_extension(tmp_path):
+    path = tmp_path / "scaler"
+    params = _params()
+    params.save(str(path))
+    assert path.exists()
+    _assert_equal(ScaleParams.load(str(path)), params)
+
+
+def test_save_load_round_trip_with_extension(tmp_path):
+    path = tmp_path / "scaler.npz"
+    params = _params()
+    params.save(path)
+    _assert_equal(ScaleParams.load(path), params)
+
+
+def test_save_load_round_trip_file_object():
+    f = io.BytesIO()
+    params = _params()
+    params.save(f)
+    f.seek(0)
+    _assert_equal(ScaleParams.load(f), params)